@@ -2,18 +2,44 @@ from .exceptions import (
     ErrorPoliticaPassword,
     ErrorAutenticacion,
     ErrorServicioNoEncontrado,
-    ErrorCredencialExistente
+    ErrorCredencialExistente,
+    ErrorReplicaSoloLectura,
+    ErrorReplicaDesincronizada
 )
 from .storage import StorageStrategy, InMemoryStorageStrategy
+from .shared_file_storage import SharedFileStorageStrategy
+from .tiered_storage import TieredStorageStrategy
+from .replication import ChangeLog, PublishingStorageStrategy, ReplicaStorageStrategy
+from .breached_passwords import BreachedPasswordIndex, build_index
+from .audit_log import AuditEvent, AuditLogIndex
 from .gestor_credenciales import GestorCredenciales
+from .pool_gestores import PoolGestores
+from .load_generator import LoadReport, generate_workload, parse_audit_trace, run_workload, saturation_curve
 
 __all__ = [
     "GestorCredenciales",
+    "PoolGestores",
     "StorageStrategy",
     "InMemoryStorageStrategy",
+    "SharedFileStorageStrategy",
+    "TieredStorageStrategy",
+    "ChangeLog",
+    "PublishingStorageStrategy",
+    "ReplicaStorageStrategy",
+    "BreachedPasswordIndex",
+    "build_index",
+    "AuditEvent",
+    "AuditLogIndex",
+    "LoadReport",
+    "generate_workload",
+    "parse_audit_trace",
+    "run_workload",
+    "saturation_curve",
     "ErrorPoliticaPassword",
     "ErrorAutenticacion",
     "ErrorServicioNoEncontrado",
     "ErrorCredencialExistente",
+    "ErrorReplicaSoloLectura",
+    "ErrorReplicaDesincronizada",
     # "saludar",
 ]
\ No newline at end of file
@@ -0,0 +1,633 @@
+# src/gestor_credenciales/audit_log.py
+
+import glob
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - plataformas sin POSIX (Windows)
+    fcntl = None
+
+# Cabecera de cada tramo del índice lateral: magic | longitud de los metadatos JSON
+MAGIC = b"GCAUDIT2"
+VERSION = 3
+HEADER = struct.Struct("<8sI")
+# Con más tramos que estos, el siguiente guardado los funde en uno
+MAX_SEGMENTS = 32
+
+# Dimensiones por las que se puede filtrar; el identificador 0 significa "sin valor"
+DIMENSIONS = ("event", "level", "service", "user")
+
+_LINE = re.compile(rb"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}) - ([A-Z]+) - ")
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+# Tipos de evento reconocidos en los mensajes de GestorCredenciales (en orden de frecuencia esperada)
+EVENT_PATTERNS = (
+    ("verificacion_exitosa", re.compile(r"Verificación de contraseña exitosa para servicio '([^']*)', usuario '([^']*)'")),
+    ("verificacion_fallida", re.compile(r"Verificación de contraseña fallida para servicio '([^']*)', usuario '([^']*)'")),
+    ("verificacion_inexistente", re.compile(r"Intento de verificar credencial inexistente: servicio '([^']*)', usuario '([^']*)'")),
+    ("autenticacion_fallida", re.compile(r"Intento de autenticación fallido")),
+    ("credencial_añadida", re.compile(r"Credencial añadida para servicio '([^']*)', usuario '([^']*)'")),
+    ("credencial_duplicada", re.compile(r"Intento de añadir credencial duplicada .*servicio '([^']*)', usuario '([^']*)'")),
+    ("password_debil", re.compile(r"Intento de añadir credencial con contraseña débil para servicio '([^']*)', usuario '([^']*)'")),
+    ("password_filtrada", re.compile(r"Intento de añadir credencial con contraseña filtrada para servicio '([^']*)', usuario '([^']*)'")),
+    ("credencial_eliminada", re.compile(r"Credencial eliminada para servicio '([^']*)', usuario '([^']*)'")),
+    ("eliminacion_inexistente", re.compile(r"Intento de eliminar credencial inexistente: servicio '([^']*)', usuario '([^']*)'")),
+    ("servicios_listados", re.compile(r"Lista de servicios solicitada")),
+    ("restablecimiento", re.compile(r"Gestor de credenciales restablecido")),
+)
+EVENT_TYPES = tuple(name for name, _ in EVENT_PATTERNS) + ("otro",)
+
+
+def _to_seconds(value: datetime) -> int:
+    return (value.toordinal() - _EPOCH_ORDINAL) * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _from_seconds(seconds: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds)
+
+
+def _classify(message: str) -> tuple[str, str, str]:
+    for event, pattern in EVENT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            service, user = match.groups() if match.groups() else ("", "")
+            return event, service, user
+    return "otro", "", ""
+
+
+def _decode(raw: bytes) -> str:
+    # logging.basicConfig escribe con la codificación local, que no siempre es UTF-8
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def _signature(path: str) -> str | None:
+    """Identifica un fichero por su primera línea, que no cambia al rotarlo ni al crecer."""
+    try:
+        with open(path, 'rb') as f:
+            first_line = f.readline(64 * 1024)
+    except FileNotFoundError:
+        return None
+    if not first_line.endswith(b"\n"):
+        return None
+    return hashlib.sha1(first_line).hexdigest()
+
+
+@dataclass
+class AuditEvent:
+    """Un registro de auditoría devuelto por una consulta."""
+    timestamp: datetime
+    level: str
+    event: str
+    service: str
+    user: str
+    message: str
+    path: str
+
+
+def _raw(values) -> memoryview:
+    # Vista de bytes de un array o de una vista tipada sobre el mmap, para copiarla sin pasar por objetos Python
+    return memoryview(values).cast('B')
+
+
+def _sort_by_time(offsets: array, timestamps: array, columns: dict[str, array]) -> tuple[array, array, dict[str, array]]:
+    """Ordena las entradas por marca de tiempo; a igual marca, conservan el orden del fichero."""
+    if all(timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1)):
+        return offsets, timestamps, columns
+    order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+    return (
+        array('Q', (offsets[i] for i in order)),
+        array('q', (timestamps[i] for i in order)),
+        {dimension: array('I', (column[i] for i in order)) for dimension, column in columns.items()},
+    )
+
+
+class _Segment:
+    """
+    Tramo de entradas de un índice, ordenadas por marca de tiempo. Las columnas
+    son arrays (tramo recién indexado) o vistas sobre el mmap del fichero
+    lateral (tramo guardado), con la misma interfaz de secuencia en ambos casos.
+    Si el reloj va hacia atrás, las líneas de un tramo no siguen el orden del
+    fichero y los rangos de tiempo de varios tramos pueden solaparse.
+
+    Las listas invertidas de cada dimensión se guardan juntas, precedidas de
+    un directorio ordenado por identificador de valor con el inicio de cada
+    lista, así que localizar una no requiere decodificar nada.
+    """
+
+    def __init__(self, offsets, timestamps, columns: dict, directory: dict):
+        self.offsets = offsets
+        self.timestamps = timestamps
+        self.columns = columns
+        # dimensión -> (identificadores, inicios, posiciones)
+        self.directory = directory
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def posting(self, dimension: str, value_id: int):
+        ids, starts, positions = self.directory[dimension]
+        i = bisect_left(ids, value_id)
+        if i == len(ids) or ids[i] != value_id:
+            return ()
+        stop = starts[i + 1] if i + 1 < len(starts) else len(positions)
+        return positions[starts[i]:stop]
+
+    @classmethod
+    def build(cls, offsets: array, timestamps: array, columns: dict[str, array]) -> "_Segment":
+        """Crea un tramo en memoria ordenando las entradas por tiempo y calculando sus listas invertidas."""
+        offsets, timestamps, columns = _sort_by_time(offsets, timestamps, columns)
+        directory = {}
+        for dimension in DIMENSIONS:
+            postings: dict[int, array] = {}
+            for position, value_id in enumerate(columns[dimension]):
+                if value_id:
+                    postings.setdefault(value_id, array('I')).append(position)
+            ids, starts, positions = array('I'), array('I'), array('I')
+            for value_id in sorted(postings):
+                ids.append(value_id)
+                starts.append(len(positions))
+                positions.extend(postings[value_id])
+            directory[dimension] = (ids, starts, positions)
+        return cls(offsets, timestamps, columns, directory)
+
+    @classmethod
+    def merge(cls, segments: list["_Segment"]) -> "_Segment":
+        offsets, timestamps = array('Q'), array('q')
+        columns = {dimension: array('I') for dimension in DIMENSIONS}
+        for segment in segments:
+            offsets.frombytes(_raw(segment.offsets))
+            timestamps.frombytes(_raw(segment.timestamps))
+            for dimension in DIMENSIONS:
+                columns[dimension].frombytes(_raw(segment.columns[dimension]))
+        return cls.build(offsets, timestamps, columns)
+
+    def encode(self, meta: dict) -> bytes:
+        """Serializa el tramo precedido de su cabecera y sus metadatos JSON."""
+        meta = dict(meta, count=len(self), directory={
+            dimension: [len(ids), len(positions)] for dimension, (ids, _, positions) in self.directory.items()
+        })
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        parts = [HEADER.pack(MAGIC, len(meta_bytes)), meta_bytes]
+        parts.append(b"\0" * (-(HEADER.size + len(meta_bytes)) % 8))
+        parts.append(bytes(self.offsets))
+        parts.append(bytes(self.timestamps))
+        for dimension in DIMENSIONS:
+            parts.append(bytes(self.columns[dimension]))
+        for dimension in DIMENSIONS:
+            for values in self.directory[dimension]:
+                parts.append(bytes(values))
+        data = b"".join(parts)
+        return data + b"\0" * (-len(data) % 8)
+
+    @classmethod
+    def decode(cls, view: memoryview, position: int) -> tuple["_Segment", dict, int]:
+        """
+        Lee el tramo que empieza en `position` sin copiar sus arrays.
+
+        Returns:
+            (tramo, metadatos, posición siguiente al tramo).
+
+        Raises:
+            ValueError: Si el tramo está incompleto o no es un tramo válido.
+        """
+        if position + HEADER.size > len(view):
+            raise ValueError("Tramo incompleto")
+        magic, meta_length = HEADER.unpack_from(view, position)
+        if magic != MAGIC:
+            raise ValueError("Tramo inválido")
+        position += HEADER.size
+        meta = json.loads(bytes(view[position:position + meta_length]))
+        position += meta_length
+        position += -position % 8
+
+        def take(typecode: str, length: int) -> memoryview:
+            nonlocal position
+            size = length * array(typecode).itemsize
+            if position + size > len(view):
+                raise ValueError("Tramo incompleto")
+            values = view[position:position + size].cast(typecode)
+            position += size
+            return values
+
+        count = meta["count"]
+        offsets = take('Q', count)
+        timestamps = take('q', count)
+        columns = {dimension: take('I', count) for dimension in DIMENSIONS}
+        directory = {}
+        for dimension in DIMENSIONS:
+            entries, total = meta["directory"][dimension]
+            directory[dimension] = (take('I', entries), take('I', entries), take('I', total))
+        position += -position % 8
+        return cls(offsets, timestamps, columns, directory), meta, position
+
+
+class _FileIndex:
+    """
+    Índice de un único fichero de log (el activo o uno rotado), persistido en un fichero lateral.
+
+    El fichero lateral es una sucesión de tramos: cada actualización añade al
+    final uno con las entradas nuevas, sin reescribir los anteriores, y al
+    cargarlo se proyecta con mmap en lugar de copiarlo. Cuando hay demasiados
+    tramos se funden en uno solo.
+    """
+
+    def __init__(self, path: str, sidecar_path: str, signature: str):
+        self.path = path
+        self.sidecar_path = sidecar_path
+        self.signature = signature
+        self.indexed_size = 0
+        self.segments: list[_Segment] = []
+        self.names: dict[str, list[str]] = {dimension: [""] for dimension in DIMENSIONS}
+        self.ids: dict[str, dict[str, int]] = {dimension: {"": 0} for dimension in DIMENSIONS}
+        self._mmap = None
+        self._sidecar_mmap = None
+        # Bytes válidos del fichero lateral y tramos y nombres que ya contiene; None obliga a reescribirlo
+        self._sidecar_size: int | None = None
+        self._sidecar_inode = -1
+        self._saved_segments = 0
+        self._saved_names = {dimension: 1 for dimension in DIMENSIONS}
+
+    # --- Persistencia ---
+
+    @classmethod
+    def load(cls, path: str, sidecar_path: str, signature: str) -> "_FileIndex":
+        index = cls(path, sidecar_path, signature)
+        try:
+            with open(sidecar_path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                sidecar_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: fichero vacío
+            return index
+        view = memoryview(sidecar_mmap)
+        position = 0
+        while position < len(view):
+            try:
+                segment, meta, end = _Segment.decode(view, position)
+            except (ValueError, KeyError, struct.error):
+                segment = None
+                break  # Un tramo final a medio escribir se descarta y se sobrescribe al guardar
+            if meta["version"] != VERSION or meta["signature"] != signature or meta["byteorder"] != sys.byteorder:
+                segment = None
+                break
+            for dimension in DIMENSIONS:
+                for name in meta["names"][dimension]:
+                    index.ids[dimension][name] = len(index.names[dimension])
+                    index.names[dimension].append(name)
+            index.segments.append(segment)
+            index.indexed_size = meta["indexed_size"]
+            position = end
+        segment = None
+        del view
+        if not index.segments:
+            sidecar_mmap.close()
+            return index
+        index._sidecar_mmap = sidecar_mmap
+        index._sidecar_size = position
+        index._sidecar_inode = inode
+        index._saved_segments = len(index.segments)
+        index._saved_names = {dimension: len(index.names[dimension]) for dimension in DIMENSIONS}
+        return index
+
+    def _segment_meta(self, names_from: dict[str, int]) -> dict:
+        return {
+            "version": VERSION,
+            "signature": self.signature,
+            "byteorder": sys.byteorder,
+            "indexed_size": self.indexed_size,
+            "names": {dimension: self.names[dimension][names_from[dimension]:] for dimension in DIMENSIONS},
+        }
+
+    def save(self) -> None:
+        """Añade al fichero lateral un tramo con lo indexado desde la última vez que se guardó."""
+        if self._sidecar_size is None or len(self.segments) > MAX_SEGMENTS or not os.path.exists(self.sidecar_path):
+            self._rewrite()
+            return
+        if self._saved_segments == len(self.segments):
+            return
+        pending = _Segment.merge(self.segments[self._saved_segments:])
+        data = pending.encode(self._segment_meta(self._saved_names))
+        with open(self.sidecar_path, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            if not self._owns_tail(f):
+                # Otro proceso lo ha ampliado o reescrito: se conserva su versión, que se cargará la próxima vez
+                logging.debug(f"AuditLogIndex: Sidecar {self.sidecar_path} changed by another process; not saving.")
+                return
+            f.seek(self._sidecar_size)
+            f.write(data)
+            f.truncate()
+        self.segments[self._saved_segments:] = [pending]
+        self._sidecar_size += len(data)
+        self._saved_segments = len(self.segments)
+        self._saved_names = {dimension: len(self.names[dimension]) for dimension in DIMENSIONS}
+
+    def _owns_tail(self, f) -> bool:
+        """Comprueba, con el cerrojo tomado, que el fichero lateral es el cargado y que nadie le ha añadido tramos."""
+        stat = os.fstat(f.fileno())
+        if stat.st_ino != self._sidecar_inode or stat.st_size < self._sidecar_size:
+            return False
+        if stat.st_size == self._sidecar_size:
+            return True
+        f.seek(self._sidecar_size)
+        try:
+            _Segment.decode(memoryview(f.read()), 0)
+        except (ValueError, KeyError, struct.error):
+            return True  # Solo hay un tramo a medio escribir por una caída: se sobrescribe
+        return False
+
+    def _rewrite(self) -> None:
+        """Funde todos los tramos en uno y reescribe el fichero lateral entero."""
+        merged = _Segment.merge(self.segments)
+        data = merged.encode(self._segment_meta({dimension: 1 for dimension in DIMENSIONS}))
+        tmp_path = f"{self.sidecar_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.sidecar_path)
+        self.segments = [merged] if len(merged) else []
+        self._close_sidecar()
+        self._sidecar_size = len(data)
+        self._sidecar_inode = os.stat(self.sidecar_path).st_ino
+        self._saved_segments = len(self.segments)
+        self._saved_names = {dimension: len(self.names[dimension]) for dimension in DIMENSIONS}
+
+    # --- Indexación incremental ---
+
+    def _id(self, dimension: str, name: str) -> int:
+        value_id = self.ids[dimension].get(name)
+        if value_id is None:
+            value_id = self.ids[dimension][name] = len(self.names[dimension])
+            self.names[dimension].append(name)
+        return value_id
+
+    def _close_map(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _close_sidecar(self) -> None:
+        if self._sidecar_mmap is not None:
+            try:
+                self._sidecar_mmap.close()
+            except BufferError:
+                pass  # Aún hay vistas vivas sobre él; se cierra solo al liberarlas
+            self._sidecar_mmap = None
+
+    def close(self) -> None:
+        self._close_map()
+        self.segments = []
+        self._close_sidecar()
+
+    def _map(self) -> mmap.mmap | None:
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return None
+        if self._mmap is None or len(self._mmap) < size:
+            self._close_map()
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def update(self) -> int:
+        """Indexa las líneas completas añadidas desde la última vez. Devuelve cuántas entradas son nuevas."""
+        size = os.path.getsize(self.path)
+        if size <= self.indexed_size:
+            return 0
+        mm = self._map()
+        end = mm.rfind(b"\n", self.indexed_size, size) + 1
+        if end <= self.indexed_size:
+            return 0
+        offsets, timestamps = array('Q'), array('q')
+        columns = {dimension: array('I') for dimension in DIMENSIONS}
+        position = self.indexed_size
+        while position < end:
+            line_end = mm.find(b"\n", position, end)
+            match = _LINE.match(mm, position, line_end)
+            if match:
+                year, month, day, hour, minute, second = (int(group) for group in match.groups()[:6])
+                timestamp = (datetime(year, month, day).toordinal() - _EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60 + second
+                message = _decode(mm[match.end():line_end])
+                event, service, user = _classify(message)
+                offsets.append(position)
+                timestamps.append(timestamp)
+                for dimension, name in (("event", event), ("level", match.group(7).decode('ascii')),
+                                        ("service", service), ("user", user)):
+                    columns[dimension].append(self._id(dimension, name))
+            position = line_end + 1
+        self.indexed_size = end
+        if offsets:
+            self.segments.append(_Segment.build(offsets, timestamps, columns))
+        return len(offsets)
+
+    # --- Consultas ---
+
+    def time_bounds(self) -> tuple[int, int] | None:
+        populated = [segment for segment in self.segments if len(segment)]
+        if not populated:
+            return None
+        return min(segment.timestamps[0] for segment in populated), max(segment.timestamps[-1] for segment in populated)
+
+    def candidates(self, since: int | None, until: int | None, filters: dict[str, str]) -> Iterator[tuple[_Segment, int]]:
+        """Genera, en orden cronológico, los pares (tramo, posición) de las entradas que cumplen los filtros."""
+        filter_ids = {}
+        for dimension, name in filters.items():
+            value_id = self.ids[dimension].get(name)
+            if value_id is None:
+                return
+            filter_ids[dimension] = value_id
+        matches = [
+            self._segment_candidates(segment, since, until, filter_ids)
+            for segment in self.segments if len(segment)
+        ]
+        if len(matches) == 1:
+            yield from matches[0]
+            return
+        # Cada tramo está ordenado por tiempo; a igual marca, los tramos anteriores van primero
+        yield from heapq.merge(*matches, key=lambda match: match[0].timestamps[match[1]])
+
+    @staticmethod
+    def _segment_candidates(segment: _Segment, since: int | None, until: int | None,
+                            filter_ids: dict[str, int]) -> Iterator[tuple[_Segment, int]]:
+        low = 0 if since is None else bisect_left(segment.timestamps, since)
+        high = len(segment) if until is None else bisect_right(segment.timestamps, until)
+        if low >= high:
+            return
+        if not filter_ids:
+            for position in range(low, high):
+                yield segment, position
+            return
+        # Se recorre la lista invertida más corta del rango y se comprueban las demás columnas
+        postings = {dimension: segment.posting(dimension, value_id) for dimension, value_id in filter_ids.items()}
+        ranges = {
+            dimension: (bisect_left(posting, low), bisect_left(posting, high))
+            for dimension, posting in postings.items()
+        }
+        driver = min(ranges, key=lambda dimension: ranges[dimension][1] - ranges[dimension][0])
+        start, stop = ranges[driver]
+        others = [(segment.columns[dimension], value_id) for dimension, value_id in filter_ids.items() if dimension != driver]
+        for position in postings[driver][start:stop]:
+            if all(column[position] == value_id for column, value_id in others):
+                yield segment, position
+
+    def event(self, segment: _Segment, position: int) -> AuditEvent:
+        mm = self._map()
+        offset = segment.offsets[position]
+        line_end = mm.find(b"\n", offset)
+        line = _decode(mm[offset:line_end])
+        message = line.split(" - ", 2)[-1]
+        return AuditEvent(
+            timestamp=_from_seconds(segment.timestamps[position]),
+            level=self.names["level"][segment.columns["level"][position]],
+            event=self.names["event"][segment.columns["event"][position]],
+            service=self.names["service"][segment.columns["service"][position]],
+            user=self.names["user"][segment.columns["user"][position]],
+            message=message,
+            path=self.path,
+        )
+
+
+class AuditLogIndex:
+    """
+    Motor de consultas sobre el rastro de auditoría (gestor_credenciales.log y sus rotaciones).
+
+    Cada fichero de log tiene un índice lateral con el desplazamiento, la
+    marca de tiempo, el tipo de evento, el nivel, el servicio y el usuario de
+    cada línea, más listas invertidas por valor. Los índices laterales solo
+    crecen por el final y se leen con mmap. Los índices se guardan en un
+    directorio aparte, identificados por la primera línea de cada fichero, de
+    forma que sobreviven a la rotación y solo se indexa lo que el log ha crecido.
+    """
+
+    def __init__(self, log_path: str, index_dir: str | None = None):
+        """
+        Args:
+            log_path (str): Ruta del log activo. Sus rotaciones ('log.1', 'log.2025-05-15', ...) se incluyen solas.
+            index_dir (str | None): Directorio de los índices laterales (por defecto '<log>.idx.d').
+        """
+        self._log_path = log_path
+        self._index_dir = index_dir if index_dir is not None else f"{log_path}.idx.d"
+        self._indexes: dict[str, _FileIndex] = {}
+
+    def _log_files(self) -> list[str]:
+        rotated = [
+            path for path in glob.glob(glob.escape(self._log_path) + ".*")
+            if not path.startswith(self._index_dir) and not path.endswith((".idx", ".tmp"))
+        ]
+        return [path for path in [self._log_path] + rotated if os.path.isfile(path)]
+
+    def refresh(self) -> int:
+        """
+        Pone al día los índices: incorpora lo añadido al log, los ficheros
+        rotados nuevos y descarta los índices de ficheros que ya no existen.
+
+        Returns:
+            El número de entradas indexadas en esta llamada.
+        """
+        os.makedirs(self._index_dir, exist_ok=True)
+        current: dict[str, _FileIndex] = {}
+        new_entries = 0
+        for path in self._log_files():
+            signature = _signature(path)
+            if signature is None:
+                continue
+            index = self._indexes.get(signature)
+            if index is None:
+                index = _FileIndex.load(path, os.path.join(self._index_dir, f"{signature}.idx"), signature)
+            elif index.path != path:
+                index._close_map()
+            index.path = path
+            if os.path.getsize(path) < index.indexed_size:
+                # Mismo comienzo pero más corto: el fichero se truncó y se reescribió
+                index.close()
+                index = _FileIndex(path, index.sidecar_path, signature)
+            added = index.update()
+            if added or not os.path.exists(index.sidecar_path):
+                index.save()
+            new_entries += added
+            current[signature] = index
+        for signature, index in self._indexes.items():
+            if signature not in current:
+                index.close()
+        for name in os.listdir(self._index_dir):
+            if name.endswith(".idx") and name[:-4] not in current:
+                os.remove(os.path.join(self._index_dir, name))
+        self._indexes = current
+        if new_entries:
+            logging.debug(f"AuditLogIndex: Indexed {new_entries} new entries for {self._log_path}.")
+        return new_entries
+
+    def query(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        service: str | None = None,
+        user: str | None = None,
+        event: str | None = None,
+        level: str | None = None,
+        limit: int | None = None,
+        refresh: bool = True,
+    ) -> list[AuditEvent]:
+        """
+        Devuelve, en orden cronológico, los registros que cumplen todos los filtros indicados.
+
+        Args:
+            since / until (datetime | None): Rango de tiempo, ambos extremos incluidos.
+            service / user (str | None): Servicio y usuario exactos.
+            event (str | None): Tipo de evento (ver EVENT_TYPES).
+            level (str | None): Nivel de log ('INFO', 'WARNING', ...).
+            limit (int | None): Número máximo de resultados.
+            refresh (bool): Si es True, indexa antes lo que el log haya crecido.
+        """
+        if refresh:
+            self.refresh()
+        since_seconds = None if since is None else _to_seconds(since)
+        until_seconds = None if until is None else _to_seconds(until)
+        filters = {
+            dimension: value
+            for dimension, value in (("service", service), ("user", user), ("event", event), ("level", level))
+            if value is not None
+        }
+        indexes = sorted(
+            (index for index in self._indexes.values() if index.time_bounds() is not None),
+            key=lambda index: index.time_bounds()
+        )
+        matches = []
+        for index in indexes:
+            first, last = index.time_bounds()
+            if (since_seconds is not None and last < since_seconds) or (until_seconds is not None and first > until_seconds):
+                continue
+            matches.append(self._matches(index, since_seconds, until_seconds, filters))
+        results: list[AuditEvent] = []
+        # Los ficheros solo se solapan en el tiempo si el reloj fue hacia atrás al rotar
+        merged = matches[0] if len(matches) == 1 else heapq.merge(*matches, key=lambda match: match[1].timestamps[match[2]])
+        for index, segment, position in merged:
+            results.append(index.event(segment, position))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    @staticmethod
+    def _matches(index: _FileIndex, since: int | None, until: int | None,
+                 filters: dict[str, str]) -> Iterator[tuple[_FileIndex, _Segment, int]]:
+        for segment, position in index.candidates(since, until, filters):
+            yield index, segment, position
+
+    def close(self) -> None:
+        for index in self._indexes.values():
+            index.close()
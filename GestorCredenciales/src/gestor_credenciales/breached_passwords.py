@@ -0,0 +1,200 @@
+# src/gestor_credenciales/breached_passwords.py
+
+import hashlib
+import heapq
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Iterable, Iterator
+
+# Cabecera: magic | versión | reservado | número de hashes
+MAGIC = b"GCBREACH"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")
+# Tabla de reparto: posición del primer hash de cada prefijo de 2 bytes (+ total al final)
+FANOUT_ENTRIES = 65536 + 1
+FANOUT = struct.Struct(f"<{FANOUT_ENTRIES}Q")
+_U64 = struct.Struct("<Q")
+DATA_OFFSET = HEADER.size + FANOUT.size
+DIGEST_SIZE = 20
+
+
+def _parse_sha1(line: str) -> bytes | None:
+    """Extrae el SHA-1 de una línea 'HASH' o 'HASH:apariciones'. Devuelve None si no es válido."""
+    hex_digest = line.strip().split(':', 1)[0]
+    if len(hex_digest) != 2 * DIGEST_SIZE:
+        return None
+    try:
+        return bytes.fromhex(hex_digest)
+    except ValueError:
+        return None
+
+
+def _write_run(digests: list[bytes], directory: str) -> str:
+    digests.sort()
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(b"".join(digests))
+    return path
+
+
+def _read_run(path: str, buffer_records: int = 65536) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(DIGEST_SIZE * buffer_records)
+            if not block:
+                return
+            for offset in range(0, len(block), DIGEST_SIZE):
+                yield block[offset:offset + DIGEST_SIZE]
+
+
+def build_index(source_path: str, index_path: str, chunk_size: int = 5_000_000) -> int:
+    """
+    Convierte una lista local de hashes SHA-1 filtrados (un hash por línea,
+    opcionalmente 'HASH:apariciones') en un índice binario ordenado y sin duplicados.
+
+    La lista se ordena por bloques de `chunk_size` hashes que luego se mezclan,
+    así que la memoria necesaria no depende del tamaño de la lista.
+
+    Args:
+        source_path (str): Fichero de texto con los hashes.
+        index_path (str): Ruta del índice a generar.
+        chunk_size (int): Hashes por bloque ordenado en memoria.
+
+    Returns:
+        El número de hashes distintos indexados.
+    """
+    directory = os.path.dirname(os.path.abspath(index_path))
+    runs: list[str] = []
+    invalid = 0
+    try:
+        chunk: list[bytes] = []
+        with open(source_path, 'r', encoding='ascii', errors='replace') as source:
+            for line in source:
+                digest = _parse_sha1(line)
+                if digest is None:
+                    if line.strip():
+                        invalid += 1
+                    continue
+                chunk.append(digest)
+                if len(chunk) >= chunk_size:
+                    runs.append(_write_run(chunk, directory))
+                    chunk = []
+        if chunk or not runs:
+            runs.append(_write_run(chunk, directory))
+
+        fanout = [0] * FANOUT_ENTRIES
+        count = 0
+        previous = None
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, 'wb') as index:
+            index.write(b"\0" * DATA_OFFSET)
+            buffer = []
+            for digest in heapq.merge(*(_read_run(run) for run in runs)):
+                if digest == previous:
+                    continue
+                previous = digest
+                fanout[(digest[0] << 8 | digest[1]) + 1] += 1
+                buffer.append(digest)
+                count += 1
+                if len(buffer) >= 65536:
+                    index.write(b"".join(buffer))
+                    buffer = []
+            index.write(b"".join(buffer))
+            for prefix in range(1, FANOUT_ENTRIES):
+                fanout[prefix] += fanout[prefix - 1]
+            index.seek(0)
+            index.write(HEADER.pack(MAGIC, VERSION, 0, count))
+            index.write(FANOUT.pack(*fanout))
+        os.replace(tmp_path, index_path)
+    finally:
+        for run in runs:
+            os.remove(run)
+    if invalid:
+        logging.warning(f"BreachedPasswordIndex: Skipped {invalid} invalid line(s) while building {index_path}.")
+    logging.info(f"BreachedPasswordIndex: Built {index_path} with {count} hash(es).")
+    return count
+
+
+class BreachedPasswordIndex:
+    """
+    Índice de solo lectura de hashes SHA-1 de contraseñas filtradas, proyectado en memoria (mmap).
+
+    La tabla de reparto acota cada búsqueda a los hashes con el mismo prefijo
+    de 2 bytes, y dentro de ese tramo se busca por interpolación: como SHA-1
+    se reparte de forma uniforme, la primera estimación suele caer en la
+    página correcta y cada consulta toca una o dos páginas de datos.
+    """
+
+    def __init__(self, path: str):
+        """
+        Abre un índice generado con build_index.
+
+        Raises:
+            ValueError: Si el fichero no es un índice válido.
+        """
+        self._path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < DATA_OFFSET:
+            self._mmap.close()
+            raise ValueError(f"'{path}' no es un índice de contraseñas filtradas válido.")
+        magic, version, _, self._count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or len(self._mmap) != DATA_OFFSET + self._count * DIGEST_SIZE:
+            self._mmap.close()
+            raise ValueError(f"'{path}' no es un índice de contraseñas filtradas válido.")
+        logging.info(f"BreachedPasswordIndex: Opened {path} with {self._count} hash(es).")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _bucket(self, digest: bytes) -> tuple[int, int]:
+        offset = HEADER.size + 8 * (digest[0] << 8 | digest[1])
+        return _U64.unpack_from(self._mmap, offset)[0], _U64.unpack_from(self._mmap, offset + 8)[0]
+
+    def _record(self, position: int) -> bytes:
+        offset = DATA_OFFSET + position * DIGEST_SIZE
+        return self._mmap[offset:offset + DIGEST_SIZE]
+
+    def _search(self, digest: bytes, low: int, high: int) -> bool:
+        key = int.from_bytes(digest[2:10], 'big')
+        low_key, high_key = 0, 1 << 64
+        while low < high:
+            position = low + (key - low_key) * (high - low) // (high_key - low_key)
+            position = min(max(position, low), high - 1)
+            record = self._record(position)
+            if record == digest:
+                return True
+            if record < digest:
+                low, low_key = position + 1, int.from_bytes(record[2:10], 'big')
+            else:
+                high, high_key = position, int.from_bytes(record[2:10], 'big') + 1
+        return False
+
+    def contains_sha1(self, digest: bytes) -> bool:
+        """Indica si un hash SHA-1 (20 bytes) está en el índice."""
+        low, high = self._bucket(digest)
+        return self._search(digest, low, high)
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_sha1(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def contains_many(self, passwords: Iterable[str]) -> list[bool]:
+        """
+        Comprueba muchas contraseñas de una vez (importaciones masivas).
+        Las consultas se resuelven en orden de hash para recorrer el índice
+        hacia delante y aprovechar las páginas ya cargadas.
+
+        Returns:
+            Una lista de booleanos en el mismo orden que `passwords`.
+        """
+        digests = [hashlib.sha1(password.encode('utf-8')).digest() for password in passwords]
+        results = [False] * len(digests)
+        for position in sorted(range(len(digests)), key=digests.__getitem__):
+            results[position] = self.contains_sha1(digests[position])
+        return results
+
+    def close(self) -> None:
+        self._mmap.close()
@@ -0,0 +1,164 @@
+# src/gestor_credenciales/cli.py
+
+import argparse
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+
+from .audit_log import EVENT_TYPES, AuditLogIndex
+from .breached_passwords import build_index
+from .load_generator import OPERATIONS, generate_workload, parse_audit_trace, saturation_curve
+from .shared_file_storage import SharedFileStorageStrategy
+from .storage import InMemoryStorageStrategy
+from .tiered_storage import TieredStorageStrategy
+
+
+def _indexar_filtraciones(args: argparse.Namespace) -> int:
+    total = build_index(args.origen, args.destino, chunk_size=args.chunk_size)
+    print(f"Índice generado en '{args.destino}' con {total} hash(es).")
+    return 0
+
+
+def _parsear_mezcla(texto: str) -> dict[str, float]:
+    mezcla = {}
+    for parte in texto.split(','):
+        operacion, _, peso = parte.partition('=')
+        if operacion not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Operación desconocida '{operacion}' (válidas: {', '.join(OPERATIONS)}).")
+        try:
+            mezcla[operacion] = float(peso)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Peso inválido para '{operacion}': '{peso}'.")
+    return mezcla
+
+
+def _parsear_niveles(texto: str) -> list[int]:
+    try:
+        niveles = [int(nivel) for nivel in texto.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Niveles de concurrencia inválidos: '{texto}'.")
+    if any(nivel < 1 for nivel in niveles):
+        raise argparse.ArgumentTypeError("Los niveles de concurrencia deben ser positivos.")
+    return niveles
+
+
+def _carga(args: argparse.Namespace) -> int:
+    if args.traza:
+        with open(args.traza, 'r', encoding='utf-8', errors='replace') as traza:
+            operaciones = parse_audit_trace(traza)
+    else:
+        operaciones = generate_workload(
+            args.operaciones, args.mezcla, args.claves, args.distribucion, args.zipf_s, args.semilla
+        )
+    # Los ficheros abiertos se cierran al salir, antes de borrar el directorio temporal
+    with tempfile.TemporaryDirectory() as directorio, ExitStack() as abiertos:
+        contador = iter(range(sys.maxsize))
+
+        def fichero() -> SharedFileStorageStrategy:
+            storage = SharedFileStorageStrategy(os.path.join(directorio, f"vault{next(contador)}.bin"))
+            abiertos.callback(storage.close)
+            return storage
+
+        fabricas = {
+            "memoria": InMemoryStorageStrategy,
+            "fichero": fichero,
+            "escalonado": lambda: TieredStorageStrategy(fichero()),
+        }
+        for almacen in args.almacen:
+            for informe in saturation_curve(fabricas[almacen], operaciones, args.concurrencia,
+                                            audit_logging=args.registrar_auditoria):
+                print(informe.summary())
+    return 0
+
+
+def _parsear_fecha(texto: str) -> datetime:
+    for formato in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Fecha inválida: '{texto}' (formato 'AAAA-MM-DD[ HH:MM[:SS]]').")
+
+
+def _auditoria(args: argparse.Namespace) -> int:
+    desde = args.desde
+    if args.ultimos_minutos is not None:
+        desde = datetime.now() - timedelta(minutes=args.ultimos_minutos)
+    indice = AuditLogIndex(args.log, args.indices)
+    try:
+        eventos = indice.query(
+            since=desde, until=args.hasta, service=args.servicio, user=args.usuario,
+            event=args.evento, level=args.nivel, limit=args.limite
+        )
+    finally:
+        indice.close()
+    for evento in eventos:
+        print(f"{evento.timestamp:%Y-%m-%d %H:%M:%S} - {evento.level} - {evento.message}")
+    return 0
+
+
+def construir_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="gestor_credenciales",
+        description="Herramientas de línea de comandos del gestor de credenciales."
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    indexar = subparsers.add_parser(
+        "indexar-filtraciones",
+        help="Genera el índice de contraseñas filtradas a partir de una lista de hashes SHA-1."
+    )
+    indexar.add_argument("origen", help="Fichero con un hash SHA-1 por línea (admite 'HASH:apariciones').")
+    indexar.add_argument("destino", help="Ruta del índice binario a generar.")
+    indexar.add_argument("--chunk-size", type=int, default=5_000_000, help="Hashes por bloque ordenado en memoria.")
+    indexar.set_defaults(funcion=_indexar_filtraciones)
+
+    carga = subparsers.add_parser(
+        "carga",
+        help="Genera o reproduce carga contra el gestor y mide rendimiento y latencias."
+    )
+    carga.add_argument("--operaciones", type=int, default=1000, help="Número de operaciones sintéticas.")
+    carga.add_argument("--mezcla", type=_parsear_mezcla, default=None,
+                       help="Pesos de cada operación, p. ej. 'add=1,verify=8,remove=0.5,list=0.5'.")
+    carga.add_argument("--claves", type=int, default=1000, help="Número de pares (servicio, usuario) distintos.")
+    carga.add_argument("--distribucion", choices=["uniform", "zipf"], default="uniform", help="Distribución de las claves.")
+    carga.add_argument("--zipf-s", type=float, default=1.0, help="Exponente de la distribución de Zipf.")
+    carga.add_argument("--semilla", type=int, default=None, help="Semilla para reproducir la misma carga.")
+    carga.add_argument("--concurrencia", type=_parsear_niveles, default=[1, 2, 4, 8],
+                       help="Niveles de concurrencia a medir, p. ej. '1,2,4,8'.")
+    carga.add_argument("--almacen", choices=["memoria", "fichero", "escalonado"], nargs='+', default=["memoria"],
+                       help="Estrategias de almacenamiento a comparar.")
+    carga.add_argument("--traza", default=None,
+                       help="Reproduce las operaciones de un log de auditoría en lugar de generarlas.")
+    carga.add_argument("--registrar-auditoria", action="store_true",
+                       help="Deja activo el logging del gestor durante la carga (por defecto se desactiva).")
+    carga.set_defaults(funcion=_carga)
+
+    auditoria = subparsers.add_parser(
+        "auditoria",
+        help="Consulta el log de auditoría usando índices laterales incrementales."
+    )
+    auditoria.add_argument("--log", default="gestor_credenciales.log", help="Log activo (se incluyen sus rotaciones).")
+    auditoria.add_argument("--indices", default=None, help="Directorio de los índices (por defecto '<log>.idx.d').")
+    auditoria.add_argument("--desde", type=_parsear_fecha, default=None, help="Inicio del rango, 'AAAA-MM-DD[ HH:MM[:SS]]'.")
+    auditoria.add_argument("--hasta", type=_parsear_fecha, default=None, help="Fin del rango, 'AAAA-MM-DD[ HH:MM[:SS]]'.")
+    auditoria.add_argument("--ultimos-minutos", type=int, default=None, help="Solo los últimos N minutos (sustituye a --desde).")
+    auditoria.add_argument("--servicio", default=None, help="Filtra por servicio.")
+    auditoria.add_argument("--usuario", default=None, help="Filtra por usuario.")
+    auditoria.add_argument("--evento", choices=EVENT_TYPES, default=None, help="Filtra por tipo de evento.")
+    auditoria.add_argument("--nivel", default=None, help="Filtra por nivel de log (INFO, WARNING, ERROR...).")
+    auditoria.add_argument("--limite", type=int, default=None, help="Número máximo de resultados.")
+    auditoria.set_defaults(funcion=_auditoria)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = construir_parser().parse_args(argv)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,4 +15,12 @@ class ErrorServicioNoEncontrado(Exception):
 
 class ErrorCredencialExistente(Exception):
     """Excepción que se lanza cuando se intenta añadir una credencial que ya está registrada"""
-    pass
\ No newline at end of file
+    pass
+
+class ErrorReplicaSoloLectura(Exception):
+    """Excepción que se lanza cuando se intenta modificar una réplica de solo lectura. Los cambios se hacen en el primario."""
+    pass
+
+class ErrorReplicaDesincronizada(Exception):
+    """Excepción que se lanza cuando una réplica ya no puede seguir el flujo de cambios del primario (huecos, flujo truncado o recreado). Hay que volver a crearla desde una foto."""
+    pass
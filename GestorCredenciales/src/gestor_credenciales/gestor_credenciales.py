@@ -3,7 +3,10 @@
 import bcrypt
 import logging
 import re
-from icontract import require, ensure, DBC
+import threading
+import time
+from collections.abc import Iterator
+from icontract import require, ensure, snapshot, DBC
 
 from .exceptions import (
     ErrorPoliticaPassword,
@@ -12,6 +15,7 @@ from .exceptions import (
     ErrorCredencialExistente
 )
 from .storage import StorageStrategy
+from .breached_passwords import BreachedPasswordIndex
 
 # Configuración del logging seguro (si no está configurado globalmente)
 logging.basicConfig(
@@ -30,24 +34,43 @@ class GestorCredenciales(DBC):
     Utiliza una estrategia de almacenamiento inyectada para la persistencia de credenciales.
     """
     
-    def __init__(self, clave_maestra: str, storage_strategy: StorageStrategy):
+    def __init__(self, clave_maestra: str, storage_strategy: StorageStrategy, indice_filtraciones: BreachedPasswordIndex | None = None):
         """
         Inicializa el gestor con una clave maestra robusta y una estrategia de almacenamiento.
         
         Args:
             clave_maestra (str): Clave maestra para autenticar operaciones.
             storage_strategy (StorageStrategy): Estrategia para almacenar las credenciales.
+            indice_filtraciones (BreachedPasswordIndex | None): Índice local de contraseñas
+                filtradas. Si se indica, se rechazan las contraseñas que aparezcan en él.
         
         Raises:
             ErrorPoliticaPassword: Si la clave maestra no cumple con la política de robustez.
         """
+        self._indice_filtraciones = indice_filtraciones
         if not self._es_password_robusta(clave_maestra):
             logging.error("Error al inicializar Gestor: La clave maestra proporcionada es débil.")
             raise ErrorPoliticaPassword("La clave maestra no cumple con la política de robustez.")
-        self._clave_maestra_hashed = self._hash_clave(clave_maestra.encode('utf-8'))
-        self._storage = storage_strategy 
+        if self._es_password_filtrada(clave_maestra):
+            logging.error("Error al inicializar Gestor: La clave maestra proporcionada aparece en filtraciones conocidas.")
+            raise ErrorPoliticaPassword("La clave maestra aparece en filtraciones conocidas.")
+        self._inicializar_estado(self._hash_clave(clave_maestra.encode('utf-8')), storage_strategy)
         logging.info(f"Gestor de credenciales inicializado correctamente con {type(storage_strategy).__name__}.")
 
+    def _inicializar_estado(self, clave_maestra_hashed: bytes, storage_strategy: StorageStrategy) -> None:
+        # (época, hash de la clave maestra): se sustituye entero para que el cambio sea atómico
+        self._estado = (0, clave_maestra_hashed)
+        self._lock_epoca = threading.Lock()
+        self._reclamaciones: list[threading.Thread] = []
+        self._storage = storage_strategy
+
+    # Pausa entre lotes del borrado en segundo plano para ceder la CPU al tráfico vivo
+    PAUSA_RECLAMACION = 0.001
+
+    @property
+    def _clave_maestra_hashed(self) -> bytes:
+        return self._estado[1]
+
     def _hash_clave(self, clave: bytes) -> bytes:
         return bcrypt.hashpw(clave, bcrypt.gensalt())
     
@@ -58,11 +81,28 @@ class GestorCredenciales(DBC):
             logging.warning("Error al verificar clave: hash malformado o incompatible.")
             return False
 
-    def _autenticar(self, clave_maestra: str) -> None:
-        if not self._verificar_clave(clave_maestra.encode('utf-8'), self._clave_maestra_hashed):
+    def _autenticar(self, clave_maestra: str) -> int:
+        epoca, clave_maestra_hashed = self._estado
+        if not self._verificar_clave(clave_maestra.encode('utf-8'), clave_maestra_hashed):
             logging.warning("Intento de autenticación fallido con clave maestra incorrecta.")
             raise ErrorAutenticacion("Clave maestra incorrecta.")
         logging.debug("Autenticación con clave maestra exitosa.")
+        return epoca
+
+    def _comprobar_epoca(self, epoca: int) -> None:
+        """Falla si la clave maestra se restableció después de autenticar la operación en curso."""
+        if self._estado[0] != epoca:
+            logging.warning("Operación rechazada: la clave maestra se restableció durante la operación.")
+            raise ErrorAutenticacion("La clave maestra ha sido restablecida.")
+
+    def _credencial_en_epoca(self, servicio: str, usuario: str, epoca: int, esperada: bool) -> bool:
+        """
+        Postcondición de añadir/eliminar: comprueba la existencia de la credencial bajo el lock de época.
+        Si entretanto se restableció la clave maestra, el almacén ya no es el que modificó la operación
+        y la comprobación no aplica.
+        """
+        with self._lock_epoca:
+            return self._estado[0] != epoca or self._storage.credential_exists(servicio, usuario) == esperada
 
     @staticmethod
     def _es_password_robusta(password: str) -> bool:
@@ -78,9 +118,14 @@ class GestorCredenciales(DBC):
             return False
         return True
 
+    def _es_password_filtrada(self, password: str) -> bool:
+        return self._indice_filtraciones is not None and password in self._indice_filtraciones
+
     def restablecer(self, nueva_clave_maestra: str) -> None:
         """
         Restablece el gestor con una nueva clave maestra y elimina todas las credenciales existentes.
+        El cambio de clave y la invalidación de las credenciales son inmediatos;
+        el borrado físico continúa en segundo plano (ver esperar_reclamacion).
         Args:
             nueva_clave_maestra (str): La nueva clave maestra a utilizar.
         Raises:
@@ -89,25 +134,75 @@ class GestorCredenciales(DBC):
         if not self._es_password_robusta(nueva_clave_maestra):
             logging.error("Error al restablecer: La nueva clave maestra proporcionada es débil.")
             raise ErrorPoliticaPassword("La nueva clave maestra no cumple con la política de robustez.")
+        if self._es_password_filtrada(nueva_clave_maestra):
+            logging.error("Error al restablecer: La nueva clave maestra proporcionada aparece en filtraciones conocidas.")
+            raise ErrorPoliticaPassword("La nueva clave maestra aparece en filtraciones conocidas.")
         
-        self._clave_maestra_hashed = self._hash_clave(nueva_clave_maestra.encode('utf-8'))
-        self._storage.clear_all_credentials()
+        nueva_clave_maestra_hashed = self._hash_clave(nueva_clave_maestra.encode('utf-8'))
+        with self._lock_epoca:
+            epoca = self._estado[0] + 1
+            # La nueva clave se guarda antes de invalidar nada: si falla, el gestor queda como estaba
+            self._persistir_clave_maestra(nueva_clave_maestra_hashed)
+            reclamador = self._storage.detach_all_credentials()
+            self._estado = (epoca, nueva_clave_maestra_hashed)
+        self._lanzar_reclamacion(reclamador, epoca)
         logging.info("Gestor de credenciales restablecido: Nueva clave maestra configurada y todas las credenciales eliminadas.")
 
+    def _persistir_clave_maestra(self, clave_maestra_hashed: bytes) -> None:
+        """Guarda el hash de una nueva clave maestra. El gestor base lo mantiene solo en memoria."""
+        pass
+
+    def _lanzar_reclamacion(self, reclamador: Iterator[int], epoca: int) -> None:
+        self._reclamaciones = [hilo for hilo in self._reclamaciones if hilo.is_alive()]
+        hilo = threading.Thread(
+            target=self._reclamar,
+            args=(reclamador, epoca),
+            name=f"reclamacion-epoca-{epoca}",
+            daemon=True
+        )
+        self._reclamaciones.append(hilo)
+        hilo.start()
+
+    def _reclamar(self, reclamador: Iterator[int], epoca: int) -> None:
+        liberadas = 0
+        for lote in reclamador:
+            liberadas += lote
+            time.sleep(self.PAUSA_RECLAMACION)
+        logging.info(f"Reclamación de la época {epoca - 1} completada: {liberadas} credencial(es) liberada(s).")
+
+    def esperar_reclamacion(self, timeout: float | None = None) -> bool:
+        """
+        Espera a que terminen los borrados en segundo plano de restablecimientos anteriores.
+        Args:
+            timeout (float | None): Tiempo máximo de espera en segundos.
+        Returns:
+            True si no queda ningún borrado pendiente, False si venció el timeout.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        for hilo in list(self._reclamaciones):
+            hilo.join(None if limite is None else max(0.0, limite - time.monotonic()))
+        return not any(hilo.is_alive() for hilo in self._reclamaciones)
+
     @require(lambda servicio, usuario: bool(servicio and usuario), "Servicio y usuario no pueden estar vacíos.")
     @require(lambda servicio: re.match(VALID_NAME_PATTERN, servicio), "Nombre de servicio inválido (solo alfanuméricos, guiones o guiones bajos).")
     @require(lambda usuario: re.match(VALID_NAME_PATTERN, usuario), "Nombre de usuario inválido (solo alfanuméricos, guiones o guiones bajos).")
-    @ensure(lambda self, servicio, usuario: self._storage.credential_exists(servicio, usuario), "La credencial no se añadió correctamente al almacenamiento.")
+    @snapshot(lambda self: self._estado[0], name="epoca")
+    @ensure(lambda self, servicio, usuario, OLD: self._credencial_en_epoca(servicio, usuario, OLD.epoca, True), "La credencial no se añadió correctamente al almacenamiento.")
     def añadir_credencial(self, clave_maestra: str, servicio: str, usuario: str, password: str) -> None:
-        self._autenticar(clave_maestra)
+        epoca = self._autenticar(clave_maestra)
         
         if not self._es_password_robusta(password):
             logging.warning(f"Intento de añadir credencial con contraseña débil para servicio '{servicio}', usuario '{usuario}'.")
             raise ErrorPoliticaPassword("La contraseña no cumple con la política de robustez.")
+        if self._es_password_filtrada(password):
+            logging.warning(f"Intento de añadir credencial con contraseña filtrada para servicio '{servicio}', usuario '{usuario}'.")
+            raise ErrorPoliticaPassword("La contraseña aparece en filtraciones conocidas.")
 
         hashed_password = self._hash_clave(password.encode('utf-8'))
         try:
-            self._storage.add_credential(servicio, usuario, hashed_password)
+            with self._lock_epoca:
+                self._comprobar_epoca(epoca)
+                self._storage.add_credential(servicio, usuario, hashed_password)
             logging.info(f"Credencial añadida para servicio '{servicio}', usuario '{usuario}'.")
         except ErrorCredencialExistente:
             logging.warning(f"Intento de añadir credencial duplicada (detectado por storage) para servicio '{servicio}', usuario '{usuario}'.")
@@ -117,9 +212,10 @@ class GestorCredenciales(DBC):
     @require(lambda usuario: bool(usuario), "Usuario no puede estar vacío.")
     @ensure(lambda result: isinstance(result, bool), "El resultado debe ser un booleano.")
     def verificar_password(self, clave_maestra: str, servicio: str, usuario: str, password_a_verificar: str) -> bool:
-        self._autenticar(clave_maestra)
+        epoca = self._autenticar(clave_maestra)
 
         hashed_password_almacenado = self._storage.get_credential(servicio, usuario)
+        self._comprobar_epoca(epoca)
         if hashed_password_almacenado is None:
             logging.warning(f"Intento de verificar credencial inexistente: servicio '{servicio}', usuario '{usuario}'.")
             raise ErrorServicioNoEncontrado(f"No se encontró credencial para el servicio '{servicio}' y usuario '{usuario}'.")
@@ -133,11 +229,15 @@ class GestorCredenciales(DBC):
 
     @require(lambda servicio: bool(servicio), "Servicio no puede estar vacío.")
     @require(lambda usuario: bool(usuario), "Usuario no puede estar vacío.")
-    @ensure(lambda self, servicio, usuario: not self._storage.credential_exists(servicio, usuario), "La credencial no se eliminó correctamente del almacenamiento.")
+    @snapshot(lambda self: self._estado[0], name="epoca")
+    @ensure(lambda self, servicio, usuario, OLD: self._credencial_en_epoca(servicio, usuario, OLD.epoca, False), "La credencial no se eliminó correctamente del almacenamiento.")
     def eliminar_credencial(self, clave_maestra: str, servicio: str, usuario: str) -> None:
-        self._autenticar(clave_maestra)
+        epoca = self._autenticar(clave_maestra)
 
-        if not self._storage.remove_credential(servicio, usuario):
+        with self._lock_epoca:
+            self._comprobar_epoca(epoca)
+            eliminada = self._storage.remove_credential(servicio, usuario)
+        if not eliminada:
             logging.warning(f"Intento de eliminar credencial inexistente: servicio '{servicio}', usuario '{usuario}'.")
             raise ErrorServicioNoEncontrado(f"No se encontró credencial para el servicio '{servicio}' y usuario '{usuario}' para eliminar.")
         
@@ -145,7 +245,8 @@ class GestorCredenciales(DBC):
 
     @ensure(lambda result: isinstance(result, list))
     def listar_servicios(self, clave_maestra: str) -> list[str]:
-        self._autenticar(clave_maestra)
+        epoca = self._autenticar(clave_maestra)
         servicios = self._storage.list_services()
+        self._comprobar_epoca(epoca)
         logging.info(f"Lista de servicios solicitada. {len(servicios)} servicio(s) encontrado(s).")
         return servicios
\ No newline at end of file
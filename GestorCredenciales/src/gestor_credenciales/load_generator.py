@@ -0,0 +1,267 @@
+# src/gestor_credenciales/load_generator.py
+
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from .gestor_credenciales import GestorCredenciales
+from .storage import StorageStrategy
+
+OP_ADD = "add"
+OP_VERIFY = "verify"
+OP_REMOVE = "remove"
+OP_LIST = "list"
+OPERATIONS = (OP_ADD, OP_VERIFY, OP_REMOVE, OP_LIST)
+
+DEFAULT_MIX = {OP_ADD: 0.1, OP_VERIFY: 0.8, OP_REMOVE: 0.05, OP_LIST: 0.05}
+
+CLAVE_MAESTRA_CARGA = "ClaveMaestraCarga123!"
+PASSWORD_CARGA = "PasswordCarga123!"
+
+# Mensajes de auditoría de GestorCredenciales que se pueden reproducir
+_TRACE_PATTERNS = (
+    (OP_ADD, re.compile(r"Credencial añadida para servicio '([^']*)', usuario '([^']*)'")),
+    (OP_VERIFY, re.compile(r"Verificación de contraseña (?:exitosa|fallida) para servicio '([^']*)', usuario '([^']*)'")),
+    (OP_VERIFY, re.compile(r"Intento de verificar credencial inexistente: servicio '([^']*)', usuario '([^']*)'")),
+    (OP_REMOVE, re.compile(r"Credencial eliminada para servicio '([^']*)', usuario '([^']*)'")),
+    (OP_LIST, re.compile(r"Lista de servicios solicitada")),
+)
+
+Operation = tuple[str, str, str]
+
+
+def generate_workload(
+    n_operations: int,
+    mix: dict[str, float] | None = None,
+    n_keys: int = 1000,
+    distribution: str = "uniform",
+    zipf_s: float = 1.0,
+    seed: int | None = None,
+) -> list[Operation]:
+    """
+    Genera una secuencia sintética de operaciones (operación, servicio, usuario).
+
+    Args:
+        n_operations (int): Número de operaciones a generar.
+        mix (dict[str, float] | None): Peso de cada operación (add, verify, remove, list).
+        n_keys (int): Número de pares (servicio, usuario) distintos.
+        distribution (str): 'uniform' o 'zipf' para elegir las claves.
+        zipf_s (float): Exponente de la distribución de Zipf.
+        seed (int | None): Semilla para obtener siempre la misma carga.
+
+    Raises:
+        ValueError: Si la mezcla o la distribución no son válidas.
+    """
+    mix = DEFAULT_MIX if mix is None else mix
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown or not any(weight > 0 for weight in mix.values()):
+        raise ValueError(f"Mezcla de operaciones inválida: {mix}")
+    if distribution == "uniform":
+        key_weights = None
+    elif distribution == "zipf":
+        key_weights = list(itertools.accumulate(1.0 / (rank ** zipf_s) for rank in range(1, n_keys + 1)))
+    else:
+        raise ValueError(f"Distribución de claves desconocida: '{distribution}'")
+
+    rng = random.Random(seed)
+    operations = rng.choices(list(mix), weights=list(mix.values()), k=n_operations)
+    keys = rng.choices(range(n_keys), cum_weights=key_weights, k=n_operations)
+    return [(operation, f"servicio{key % 100}", f"usuario{key}") for operation, key in zip(operations, keys)]
+
+
+def parse_audit_trace(lines: Iterable[str]) -> list[Operation]:
+    """
+    Reconstruye la secuencia de operaciones a partir de registros de auditoría
+    con el formato de gestor_credenciales.log. Las líneas que no corresponden a
+    una operación reproducible se ignoran.
+    """
+    operations = []
+    for line in lines:
+        for operation, pattern in _TRACE_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                service, user = match.groups() if match.groups() else ("", "")
+                operations.append((operation, service, user))
+                break
+    return operations
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percentile / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+@dataclass
+class LoadReport:
+    """Resultado de ejecutar una carga contra una estrategia de almacenamiento."""
+    storage: str
+    concurrency: int
+    operations: int
+    duration: float
+    latencies: dict[str, list[float]] = field(default_factory=dict, repr=False)
+    errors: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Operaciones por segundo."""
+        return self.operations / self.duration if self.duration > 0 else 0.0
+
+    def percentiles(self, operation: str | None = None) -> dict[str, float]:
+        """Percentiles de latencia (en segundos) de una operación, o de todas si no se indica."""
+        if operation is None:
+            values = sorted(itertools.chain.from_iterable(self.latencies.values()))
+        else:
+            values = sorted(self.latencies.get(operation, []))
+        return {
+            "p50": _percentile(values, 50),
+            "p90": _percentile(values, 90),
+            "p99": _percentile(values, 99),
+            "max": values[-1] if values else 0.0,
+        }
+
+    def summary(self) -> str:
+        total = self.percentiles()
+        lines = [
+            f"{self.storage} · concurrencia {self.concurrency}: {self.operations} ops en {self.duration:.2f}s "
+            f"({self.throughput:.1f} ops/s) p50={total['p50'] * 1000:.1f}ms p90={total['p90'] * 1000:.1f}ms "
+            f"p99={total['p99'] * 1000:.1f}ms"
+        ]
+        for operation in OPERATIONS:
+            if operation in self.latencies:
+                stats = self.percentiles(operation)
+                lines.append(
+                    f"  {operation:<6} n={len(self.latencies[operation]):<6} p50={stats['p50'] * 1000:.1f}ms "
+                    f"p99={stats['p99'] * 1000:.1f}ms"
+                )
+        if self.errors:
+            lines.append(f"  errores: {self.errors}")
+        return "\n".join(lines)
+
+
+def _preload(storage: StorageStrategy, operations: list[Operation], hashed_password: bytes) -> None:
+    """Da de alta, directamente en el almacén, las claves que la carga verifica o elimina sin añadirlas antes."""
+    added = set()
+    for operation, service, user in operations:
+        key = (service, user)
+        if operation == OP_ADD:
+            added.add(key)
+        elif operation in (OP_VERIFY, OP_REMOVE) and key not in added and not storage.credential_exists(service, user):
+            storage.add_credential(service, user, hashed_password)
+            added.add(key)
+
+
+@contextmanager
+def _logging_disabled(disabled: bool):
+    """Desactiva el logging mientras dura el bloque y restaura después el nivel que hubiera."""
+    if not disabled:
+        yield
+        return
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        logging.disable(previous)
+
+
+def run_workload(
+    storage_factory: Callable[[], StorageStrategy],
+    operations: list[Operation],
+    concurrency: int = 1,
+    preload: bool = True,
+    audit_logging: bool = False,
+) -> LoadReport:
+    """
+    Ejecuta una carga contra un GestorCredenciales nuevo sobre la estrategia indicada.
+
+    Args:
+        storage_factory: Crea la estrategia de almacenamiento a medir.
+        operations: Operaciones a ejecutar, en orden de envío.
+        concurrency (int): Número de hilos que envían operaciones a la vez.
+        preload (bool): Si es True, crea antes las credenciales que la carga
+            verifica o elimina sin haberlas añadido (y que fallarían).
+        audit_logging (bool): Si es False (por defecto), el logging queda desactivado
+            durante la ejecución. Así los eventos sintéticos no acaban en el log de
+            auditoría real y su escritura no cuenta en las latencias. La
+            desactivación afecta a todo el proceso mientras dura la carga.
+
+    Returns:
+        Un LoadReport con rendimiento, latencias y errores por tipo.
+    """
+    with _logging_disabled(not audit_logging):
+        storage, duration, latencies, errors = _run(storage_factory, operations, concurrency, preload)
+    report = LoadReport(type(storage).__name__, concurrency, len(operations), duration, latencies, errors)
+    logging.info(f"Carga completada: {report.operations} ops sobre {report.storage} con concurrencia {concurrency} ({report.throughput:.1f} ops/s).")
+    return report
+
+
+def _run(
+    storage_factory: Callable[[], StorageStrategy],
+    operations: list[Operation],
+    concurrency: int,
+    preload: bool,
+) -> tuple[StorageStrategy, float, dict[str, list[float]], dict[str, int]]:
+    storage = storage_factory()
+    gestor = GestorCredenciales(CLAVE_MAESTRA_CARGA, storage)
+    if preload:
+        _preload(storage, operations, gestor._hash_clave(PASSWORD_CARGA.encode('utf-8')))
+
+    handlers = {
+        OP_ADD: lambda service, user: gestor.añadir_credencial(CLAVE_MAESTRA_CARGA, service, user, PASSWORD_CARGA),
+        OP_VERIFY: lambda service, user: gestor.verificar_password(CLAVE_MAESTRA_CARGA, service, user, PASSWORD_CARGA),
+        OP_REMOVE: lambda service, user: gestor.eliminar_credencial(CLAVE_MAESTRA_CARGA, service, user),
+        OP_LIST: lambda service, user: gestor.listar_servicios(CLAVE_MAESTRA_CARGA),
+    }
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    lock = threading.Lock()
+    pending = iter(operations)
+
+    def worker() -> None:
+        while True:
+            with lock:
+                operation = next(pending, None)
+            if operation is None:
+                return
+            name, service, user = operation
+            start = time.perf_counter()
+            error = None
+            try:
+                handlers[name](service, user)
+            except Exception as exc:  # Los errores forman parte del resultado de la carga
+                error = type(exc).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.setdefault(name, []).append(elapsed)
+                if error is not None:
+                    errors[error] = errors.get(error, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    duration = time.perf_counter() - start
+    return storage, duration, latencies, errors
+
+
+def saturation_curve(
+    storage_factory: Callable[[], StorageStrategy],
+    operations: list[Operation],
+    concurrency_levels: Iterable[int] = (1, 2, 4, 8),
+    preload: bool = True,
+    audit_logging: bool = False,
+) -> list[LoadReport]:
+    """
+    Ejecuta la misma carga con niveles de concurrencia crecientes, cada uno
+    sobre un almacén nuevo, para ver dónde deja de crecer el rendimiento.
+    """
+    return [run_workload(storage_factory, operations, level, preload, audit_logging) for level in concurrency_levels]
@@ -0,0 +1,373 @@
+# src/gestor_credenciales/pool_gestores.py
+
+import hashlib
+import hmac
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from icontract import require, DBC
+
+from .breached_passwords import BreachedPasswordIndex
+from .exceptions import ErrorAutenticacion, ErrorCredencialExistente
+from .gestor_credenciales import GestorCredenciales, VALID_NAME_PATTERN
+from .storage import StorageStrategy
+
+# Separador de espacios de nombres. No puede aparecer en nombres válidos (VALID_NAME_PATTERN),
+# así que los servicios que empiezan por él quedan reservados para el pool
+SEPARADOR = "::"
+# Cada tenant tiene en el almacén compartido un servicio de metadatos propio, '::tenant::<tenant>':
+# - usuario 'alta': marca de alta, que no se borra nunca y reserva el nombre;
+# - usuario '<generación>': hash de la clave maestra de esa generación.
+# Un restablecimiento añade la generación nueva antes de borrar la anterior, así que en
+# todo momento hay al menos una, y la vigente es siempre la más alta.
+PREFIJO_METADATOS = f"{SEPARADOR}tenant{SEPARADOR}"
+USUARIO_ALTA = "alta"
+# Y un índice por generación, '::servicios::<tenant>::<generación>', con un usuario por cada
+# servicio en el que tiene credenciales: listar o vaciar un tenant no recorre los de los demás
+PREFIJO_INDICE = f"{SEPARADOR}servicios{SEPARADOR}"
+
+
+def _servicio_metadatos(tenant: str) -> str:
+    return f"{PREFIJO_METADATOS}{tenant}"
+
+
+class _TenantStorageView(StorageStrategy):
+    """
+    Vista de un tenant sobre el almacén compartido: antepone a cada servicio
+    el prefijo '<tenant>::<generación>::'. Cambiar de generación invalida de
+    golpe todas las credenciales del tenant sin tocar las de los demás.
+
+    Los servicios de cada generación se apuntan en su índice. Quien añade una
+    credencial la apunta después de escribirla, y quien retira la última de un
+    servicio, tras desapuntarlo, vuelve a mirar si alguien ha añadido otra
+    entretanto; así un servicio con credenciales nunca queda fuera del índice.
+    """
+
+    def __init__(self, backend: StorageStrategy, tenant: str, generation: int):
+        self._backend = backend
+        self._tenant = tenant
+        self.generation = generation
+
+    def _prefix(self, generation: int | None = None) -> str:
+        generation = self.generation if generation is None else generation
+        return f"{self._tenant}{SEPARADOR}{generation}{SEPARADOR}"
+
+    def _index(self, generation: int | None = None) -> str:
+        generation = self.generation if generation is None else generation
+        return f"{PREFIJO_INDICE}{self._tenant}{SEPARADOR}{generation}"
+
+    def _register(self, index: str, service: str) -> None:
+        if self._backend.credential_exists(index, service):
+            return
+        try:
+            self._backend.add_credential(index, service, b"")
+        except ErrorCredencialExistente:
+            pass  # Otro proceso lo ha apuntado a la vez
+
+    def add_credential(self, service: str, user: str, hashed_password: bytes) -> None:
+        generation = self.generation
+        self._backend.add_credential(self._prefix(generation) + service, user, hashed_password)
+        self._register(self._index(generation), service)
+
+    def get_credential(self, service: str, user: str) -> bytes | None:
+        return self._backend.get_credential(self._prefix() + service, user)
+
+    def remove_credential(self, service: str, user: str) -> bool:
+        generation = self.generation
+        removed = self._backend.remove_credential(self._prefix(generation) + service, user)
+        if removed and not self._backend.list_users(self._prefix(generation) + service):
+            self._backend.remove_credential(self._index(generation), service)
+            if self._backend.list_users(self._prefix(generation) + service):
+                self._register(self._index(generation), service)
+        return removed
+
+    def list_services(self) -> list[str]:
+        prefix = self._prefix()
+        # Una baja interrumpida puede dejar apuntado un servicio ya vacío
+        return [service for service in self._backend.list_users(self._index()) if self._backend.list_users(prefix + service)]
+
+    def list_users(self, service: str) -> list[str]:
+        return self._backend.list_users(self._prefix() + service)
+
+    def clear_all_credentials(self) -> None:
+        for _ in self._reclaim(self.generation, batch_size=1000):
+            pass
+
+    def detach_all_credentials(self, batch_size: int = 1000) -> Iterator[int]:
+        old_generation = self.generation
+        self.generation += 1
+        return self._reclaim(old_generation, batch_size)
+
+    def _reclaim(self, generation: int, batch_size: int) -> Iterator[int]:
+        prefix, index = self._prefix(generation), self._index(generation)
+        freed = 0
+        for service in self._backend.list_users(index):
+            for user in self._backend.list_users(prefix + service):
+                if self._backend.remove_credential(prefix + service, user):
+                    freed += 1
+                if freed >= batch_size:
+                    yield freed
+                    freed = 0
+            self._backend.remove_credential(index, service)
+        if freed:
+            yield freed
+
+    def credential_exists(self, service: str, user: str) -> bool:
+        return self._backend.credential_exists(self._prefix() + service, user)
+
+    def change_counter(self) -> int | None:
+        return self._backend.change_counter()
+
+    def changes_since(self, counter: int | None) -> tuple[int | None, list[tuple[str, str]] | None]:
+        counter, keys = self._backend.changes_since(counter)
+        if keys is None:
+            return counter, None
+        prefix = self._prefix()
+        return counter, [(service[len(prefix):], user) for service, user in keys if service.startswith(prefix)]
+
+
+class _GestorTenant(GestorCredenciales):
+    """
+    GestorCredenciales de un tenant del pool. Recuerda la última clave maestra
+    autenticada (como HMAC con un secreto del proceso, nunca en claro) para no
+    repetir la comprobación bcrypt mientras siga en la caché del pool.
+    """
+
+    def __init__(self, pool: "PoolGestores", tenant: str, clave_maestra: str, storage_view: _TenantStorageView,
+                 indice_filtraciones: BreachedPasswordIndex | None = None):
+        self._pool = pool
+        self._tenant = tenant
+        self._autenticado: tuple[int, bytes] | None = None
+        # Época autenticada del restablecimiento en curso en cada hilo
+        self._restablecimiento = threading.local()
+        super().__init__(clave_maestra, storage_view, indice_filtraciones)
+
+    @classmethod
+    def _cargar(cls, pool: "PoolGestores", tenant: str, clave_maestra_hashed: bytes, storage_view: _TenantStorageView,
+                indice_filtraciones: BreachedPasswordIndex | None = None) -> "_GestorTenant":
+        """Reconstruye el gestor de un tenant ya registrado a partir de su hash, sin volver a calcularlo."""
+        gestor = cls.__new__(cls)
+        gestor._pool = pool
+        gestor._tenant = tenant
+        gestor._autenticado = None
+        gestor._restablecimiento = threading.local()
+        gestor._indice_filtraciones = indice_filtraciones
+        gestor._inicializar_estado(clave_maestra_hashed, storage_view)
+        return gestor
+
+    def _autenticar(self, clave_maestra: str) -> int:
+        epoca = self._estado[0]
+        digest = self._pool._digest(self._tenant, clave_maestra)
+        autenticado = self._autenticado
+        if autenticado is not None and autenticado[0] == epoca and hmac.compare_digest(autenticado[1], digest):
+            self._pool._contar("autenticaciones_en_cache")
+        else:
+            self._pool._contar("autenticaciones_bcrypt")
+            epoca = super()._autenticar(clave_maestra)
+            self._autenticado = (epoca, digest)
+        # Solo una autenticación correcta mete o refresca al tenant en la caché del pool
+        self._pool._cachear(self._tenant, self)
+        return epoca
+
+    def _comprobar_epoca(self, epoca: int) -> None:
+        super()._comprobar_epoca(epoca)
+        # Otro proceso puede haber restablecido el tenant sin pasar por este gestor
+        if self._pool._generacion_superada(self._tenant, self._storage.generation):
+            logging.warning(f"Operación rechazada: el tenant '{self._tenant}' se restableció en otro proceso.")
+            raise ErrorAutenticacion("La clave maestra del tenant ha sido restablecida.")
+
+    def _persistir_clave_maestra(self, clave_maestra_hashed: bytes) -> None:
+        # Con el lock de época tomado: la clave autenticada sigue siendo la vigente
+        epoca = getattr(self._restablecimiento, "epoca", None)
+        if epoca is not None:
+            self._comprobar_epoca(epoca)
+        # Se publica la generación siguiente antes de que detach_all_credentials la adopte
+        self._pool._publicar_generacion(self._tenant, self._storage.generation + 1, clave_maestra_hashed)
+
+    def restablecer(self, nueva_clave_maestra: str, epoca: int | None = None) -> None:
+        """
+        Como GestorCredenciales.restablecer. Si se indica la época en la que se autenticó
+        la clave maestra, falla con ErrorAutenticacion si otro restablecimiento se adelantó.
+        """
+        generacion_anterior = self._storage.generation
+        self._restablecimiento.epoca = epoca
+        try:
+            super().restablecer(nueva_clave_maestra)
+        finally:
+            self._restablecimiento.epoca = None
+        self._autenticado = None
+        self._pool._retirar_generacion(self._tenant, generacion_anterior)
+
+
+class PoolGestores(DBC):
+    """
+    Pool de gestores de credenciales multi-tenant sobre un único almacén compartido.
+
+    Cada tenant tiene su propio espacio de nombres dentro del almacén y su
+    propia clave maestra, cuyo hash se guarda en el mismo almacén. Los
+    metadatos de un tenant solo se leen la primera vez que se usa, y los
+    tenants autenticados recientemente se mantienen en una caché LRU acotada en la
+    que una clave maestra ya comprobada no vuelve a pasar por bcrypt. Cada uso
+    de un tenant en caché consulta si existe una generación posterior, así
+    que un restablecimiento hecho por otro proceso se nota en la siguiente
+    operación.
+    """
+
+    def __init__(self, storage_strategy: StorageStrategy, capacidad: int = 1024,
+                 indice_filtraciones: BreachedPasswordIndex | None = None):
+        """
+        Args:
+            storage_strategy (StorageStrategy): Almacén compartido por todos los tenants.
+                Debe permitir enumerar usuarios (list_users): así se leen los metadatos
+                y el índice de servicios de cada tenant.
+            capacidad (int): Número máximo de tenants desbloqueados en memoria.
+            indice_filtraciones (BreachedPasswordIndex | None): Índice de contraseñas filtradas.
+
+        Raises:
+            ValueError: Si la capacidad no es positiva.
+        """
+        if capacidad < 1:
+            raise ValueError("La capacidad del pool debe ser positiva.")
+        self._storage = storage_strategy
+        self._capacidad = capacidad
+        self._indice_filtraciones = indice_filtraciones
+        self._secreto = os.urandom(32)
+        self._gestores: OrderedDict[str, _GestorTenant] = OrderedDict()
+        self._lock = threading.Lock()
+        self._estadisticas = {"autenticaciones_en_cache": 0, "autenticaciones_bcrypt": 0, "tenants_cargados": 0}
+        logging.info(f"Pool de gestores inicializado con {type(storage_strategy).__name__} y capacidad {capacidad}.")
+
+    def _digest(self, tenant: str, clave_maestra: str) -> bytes:
+        return hmac.new(self._secreto, f"{tenant}\0{clave_maestra}".encode('utf-8'), hashlib.sha256).digest()
+
+    def _contar(self, estadistica: str) -> None:
+        with self._lock:
+            self._estadisticas[estadistica] += 1
+
+    def _publicar_generacion(self, tenant: str, generacion: int, clave_maestra_hashed: bytes) -> None:
+        """
+        Guarda en una sola escritura la clave maestra de una generación nueva.
+
+        Raises:
+            ErrorAutenticacion: Si otro proceso ya restableció el tenant a esa generación.
+        """
+        try:
+            self._storage.add_credential(_servicio_metadatos(tenant), str(generacion), clave_maestra_hashed)
+        except ErrorCredencialExistente:
+            logging.warning(f"Restablecimiento concurrente del tenant '{tenant}' a la generación {generacion}.")
+            raise ErrorAutenticacion("La clave maestra del tenant ha sido restablecida por otro proceso.")
+
+    def _retirar_generacion(self, tenant: str, generacion: int) -> None:
+        self._storage.remove_credential(_servicio_metadatos(tenant), str(generacion))
+
+    def _generacion_superada(self, tenant: str, generacion: int) -> bool:
+        return self._storage.credential_exists(_servicio_metadatos(tenant), str(generacion + 1))
+
+    def _leer_metadatos(self, tenant: str) -> tuple[int, bytes] | None:
+        """Devuelve (generación vigente, hash de la clave maestra) del tenant, o None si no existe."""
+        servicio = _servicio_metadatos(tenant)
+        while True:
+            # Solo se leen los metadatos de este tenant: la marca de alta y una o dos generaciones
+            generaciones = [int(usuario) for usuario in self._storage.list_users(servicio) if usuario.isdigit()]
+            if not generaciones:
+                return None
+            generacion = max(generaciones)
+            clave_maestra_hashed = self._storage.get_credential(servicio, str(generacion))
+            if clave_maestra_hashed is not None:
+                return generacion, clave_maestra_hashed
+            # Otro proceso la ha sustituido entre la lista y la lectura: se vuelve a buscar
+
+    def _cachear(self, tenant: str, gestor: _GestorTenant) -> _GestorTenant:
+        with self._lock:
+            actual = self._gestores.get(tenant)
+            if actual is None or actual._storage.generation < gestor._storage.generation:
+                self._gestores[tenant] = actual = gestor
+            gestor = actual
+            self._gestores.move_to_end(tenant)
+            while len(self._gestores) > self._capacidad:
+                expulsado, _ = self._gestores.popitem(last=False)
+                logging.debug(f"Pool de gestores: tenant '{expulsado}' expulsado de la caché.")
+        return gestor
+
+    def _gestor(self, tenant: str) -> _GestorTenant:
+        with self._lock:
+            gestor = self._gestores.get(tenant)
+        # Una consulta por uso comprueba que ningún otro proceso haya restablecido el tenant
+        if gestor is not None and not self._generacion_superada(tenant, gestor._storage.generation):
+            return gestor
+        metadatos = self._leer_metadatos(tenant)
+        if metadatos is None:
+            logging.warning(f"Intento de acceso a tenant inexistente '{tenant}'.")
+            raise ErrorAutenticacion("Tenant o clave maestra incorrectos.")
+        generacion, clave_maestra_hashed = metadatos
+        vista = _TenantStorageView(self._storage, tenant, generacion)
+        gestor = _GestorTenant._cargar(self, tenant, clave_maestra_hashed, vista, self._indice_filtraciones)
+        self._contar("tenants_cargados")
+        # No se cachea todavía: eso lo hace _autenticar si la clave maestra es correcta
+        return gestor
+
+    @require(lambda tenant: bool(tenant) and re.match(VALID_NAME_PATTERN, tenant), "Nombre de tenant inválido (solo alfanuméricos, guiones o guiones bajos).")
+    def registrar_tenant(self, tenant: str, clave_maestra: str) -> None:
+        """
+        Da de alta un tenant nuevo con su clave maestra.
+
+        Raises:
+            ErrorPoliticaPassword: Si la clave maestra no cumple con la política de robustez.
+            ErrorCredencialExistente: Si el tenant ya existe.
+        """
+        vista = _TenantStorageView(self._storage, tenant, 0)
+        gestor = _GestorTenant(self, tenant, clave_maestra, vista, self._indice_filtraciones)
+        # La marca de alta reserva el nombre de forma atómica (ErrorCredencialExistente si ya existe)
+        self._storage.add_credential(_servicio_metadatos(tenant), USUARIO_ALTA, b"")
+        self._storage.add_credential(_servicio_metadatos(tenant), "0", gestor._clave_maestra_hashed)
+        self._cachear(tenant, gestor)
+        logging.info(f"Tenant '{tenant}' registrado en el pool de gestores.")
+
+    @require(lambda tenant: bool(tenant), "Tenant no puede estar vacío.")
+    def añadir_credencial(self, tenant: str, clave_maestra: str, servicio: str, usuario: str, password: str) -> None:
+        self._gestor(tenant).añadir_credencial(clave_maestra, servicio, usuario, password)
+
+    @require(lambda tenant: bool(tenant), "Tenant no puede estar vacío.")
+    def verificar_password(self, tenant: str, clave_maestra: str, servicio: str, usuario: str, password_a_verificar: str) -> bool:
+        return self._gestor(tenant).verificar_password(clave_maestra, servicio, usuario, password_a_verificar)
+
+    @require(lambda tenant: bool(tenant), "Tenant no puede estar vacío.")
+    def eliminar_credencial(self, tenant: str, clave_maestra: str, servicio: str, usuario: str) -> None:
+        self._gestor(tenant).eliminar_credencial(clave_maestra, servicio, usuario)
+
+    @require(lambda tenant: bool(tenant), "Tenant no puede estar vacío.")
+    def listar_servicios(self, tenant: str, clave_maestra: str) -> list[str]:
+        return self._gestor(tenant).listar_servicios(clave_maestra)
+
+    @require(lambda tenant: bool(tenant), "Tenant no puede estar vacío.")
+    def restablecer(self, tenant: str, clave_maestra: str, nueva_clave_maestra: str) -> None:
+        """
+        Cambia la clave maestra de un tenant y elimina sus credenciales (ver GestorCredenciales.restablecer).
+        Exige la clave maestra vigente del tenant: sin ella, nadie puede vaciar un tenant ajeno.
+
+        Raises:
+            ErrorAutenticacion: Si el tenant no existe, la clave maestra es incorrecta o
+                otro restablecimiento se adelantó tras autenticarla.
+            ErrorPoliticaPassword: Si la nueva clave maestra no es robusta.
+        """
+        gestor = self._gestor(tenant)
+        epoca = gestor._autenticar(clave_maestra)
+        gestor.restablecer(nueva_clave_maestra, epoca)
+        # Se cachea para que esperar_reclamacion vea su borrado en segundo plano
+        self._cachear(tenant, gestor)
+
+    def esperar_reclamacion(self, timeout: float | None = None) -> bool:
+        """Espera a los borrados en segundo plano de los tenants que siguen en la caché."""
+        with self._lock:
+            gestores = list(self._gestores.values())
+        return all(gestor.esperar_reclamacion(timeout) for gestor in gestores)
+
+    def estadisticas(self) -> dict[str, int]:
+        """Autenticaciones resueltas en caché frente a bcrypt, tenants cargados y tenants en memoria."""
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas["tenants_en_cache"] = len(self._gestores)
+        return estadisticas
@@ -0,0 +1,467 @@
+# src/gestor_credenciales/replication.py
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+
+from .exceptions import ErrorReplicaDesincronizada, ErrorReplicaSoloLectura
+from .storage import StorageStrategy
+
+OP_ADD = "add"
+OP_REMOVE = "remove"
+OP_CLEAR = "clear"
+
+# Cambios recientes que recuerda una réplica para responder a changes_since
+RECENT_CHANGES = 1024
+
+# Cuánto se relee hacia atrás al arrancar desde una foto para localizar el último cambio que recoge
+SNAPSHOT_LOOKBACK = 64 * 1024
+
+# Tamaño de los bloques con los que se lee el flujo hacia atrás desde el final
+READ_BACK_CHUNK = 4096
+
+
+def _encode_hash(hashed_password: bytes) -> str:
+    return base64.b64encode(hashed_password).decode('ascii')
+
+
+def _decode_hash(encoded: str) -> bytes:
+    return base64.b64decode(encoded.encode('ascii'))
+
+
+def _last_newline(fd: int, end: int) -> int:
+    """Devuelve la posición del último salto de línea antes de `end` (-1 si no hay), leyendo hacia atrás."""
+    while end > 0:
+        start = max(0, end - READ_BACK_CHUNK)
+        found = os.pread(fd, end - start, start).rfind(b'\n')
+        if found >= 0:
+            return start + found
+        end = start
+    return -1
+
+
+class ChangeLog:
+    """
+    Flujo de cambios ordenado, persistido en un fichero JSON Lines.
+    Cada línea es un cambio con su número de secuencia. Lo escribe un único
+    primario y lo pueden leer tantas réplicas (procesos) como se quiera.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        """
+        Abre (o crea) el fichero del flujo de cambios. Si el primario anterior
+        murió a mitad de una escritura, corta la línea incompleta del final:
+        los cambios siguientes no pueden ir pegados a ella.
+
+        Args:
+            path (str): Ruta del fichero del flujo.
+            fsync (bool): Si es True, fuerza a disco cada cambio publicado.
+        """
+        self._path = path
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b', buffering=0)
+        self._truncate_torn_line()
+        logging.info(f"ChangeLog opened at {path}.")
+
+    def _truncate_torn_line(self) -> None:
+        end = self._file.seek(0, os.SEEK_END)
+        complete = _last_newline(self._file.fileno(), end) + 1
+        if complete < end:
+            logging.warning(f"ChangeLog: Truncating {end - complete} byte(s) of a torn change at the end of {self._path}.")
+            os.ftruncate(self._file.fileno(), complete)
+            self._file.seek(complete)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def append(self, change: dict) -> int:
+        """
+        Añade un cambio al final del flujo con una única escritura, de modo
+        que los lectores nunca vean una línea a medias como completa.
+
+        Returns:
+            El desplazamiento en bytes del final del flujo tras el cambio.
+        """
+        line = json.dumps(change, separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._lock:
+            end = self._file.tell()
+            try:
+                if self._file.write(line) != len(line):
+                    raise OSError(f"short write appending to the change log at {self._path}")
+                if self._fsync:
+                    os.fsync(self._file.fileno())
+            except BaseException:
+                # Sin publicar: se quita lo que haya llegado a escribirse para no dejar una línea a medias
+                os.ftruncate(self._file.fileno(), end)
+                self._file.seek(end)
+                raise
+            return self._file.tell()
+
+    def end_offset(self) -> int:
+        with self._lock:
+            return self._file.tell()
+
+    def last_sequence(self) -> int:
+        """
+        Devuelve el número de secuencia del último cambio publicado (0 si no hay).
+        Solo lee la última línea, buscándola hacia atrás desde el final del flujo.
+        """
+        with self._lock:
+            end = os.fstat(self._file.fileno()).st_size
+            if not end:
+                return 0
+            start = _last_newline(self._file.fileno(), end - 1) + 1
+            return json.loads(os.pread(self._file.fileno(), end - start, start))["seq"]
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_changes(path: str, offset: int) -> tuple[list[dict], int]:
+    """
+    Lee los cambios completos del flujo a partir de un desplazamiento.
+    Una última línea sin salto de línea todavía se está escribiendo y se ignora.
+
+    Returns:
+        La lista de cambios leídos y el desplazamiento desde el que seguir.
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = data.rfind(b'\n') + 1
+    changes = [json.loads(line) for line in data[:end].splitlines() if line]
+    return changes, offset + end
+
+
+def _line_ending_at(path: str, offset: int) -> bytes | None:
+    """Devuelve la línea completa que termina justo en `offset`, o None si no hay ninguna."""
+    back = min(offset, SNAPSHOT_LOOKBACK)
+    with open(path, 'rb') as f:
+        f.seek(offset - back)
+        previous = f.read(back)
+    start = previous.rfind(b'\n', 0, len(previous) - 1) + 1
+    if len(previous) < back or not previous.endswith(b'\n') or (start == 0 and back < offset):
+        return None
+    return previous[start:]
+
+
+class PublishingStorageStrategy(StorageStrategy):
+    """
+    Decorador de StorageStrategy que publica cada mutación en un ChangeLog.
+    Las lecturas se delegan sin más en la estrategia envuelta.
+    """
+
+    def __init__(self, inner: StorageStrategy, change_log: ChangeLog):
+        self._inner = inner
+        self._change_log = change_log
+        self._lock = threading.Lock()
+        self._sequence = change_log.last_sequence()
+        logging.info(f"PublishingStorageStrategy initialized over {type(inner).__name__} at sequence {self._sequence}.")
+
+    @property
+    def last_sequence(self) -> int:
+        """Número de secuencia del último cambio publicado. Sirve para leer lo propio en una réplica."""
+        return self._sequence
+
+    def _publish(self, op: str, **fields) -> None:
+        # La secuencia solo avanza si el cambio llega al flujo: un fallo no deja huecos
+        self._change_log.append({"seq": self._sequence + 1, "op": op, **fields})
+        self._sequence += 1
+
+    def add_credential(self, service: str, user: str, hashed_password: bytes) -> None:
+        with self._lock:
+            self._inner.add_credential(service, user, hashed_password)
+            try:
+                self._publish(OP_ADD, service=service, user=user, hashed_password=_encode_hash(hashed_password))
+            except BaseException:
+                self._inner.remove_credential(service, user)
+                raise
+
+    def get_credential(self, service: str, user: str) -> bytes | None:
+        return self._inner.get_credential(service, user)
+
+    def remove_credential(self, service: str, user: str) -> bool:
+        with self._lock:
+            previous = self._inner.get_credential(service, user)
+            removed = self._inner.remove_credential(service, user)
+            if removed:
+                try:
+                    self._publish(OP_REMOVE, service=service, user=user)
+                except BaseException:
+                    self._inner.add_credential(service, user, previous)
+                    raise
+            return removed
+
+    def list_services(self) -> list[str]:
+        return self._inner.list_services()
+
+    def list_users(self, service: str) -> list[str]:
+        return self._inner.list_users(service)
+
+    def clear_all_credentials(self) -> None:
+        # Un vaciado no se puede deshacer: se publica antes de aplicarlo
+        with self._lock:
+            self._publish(OP_CLEAR)
+            self._inner.clear_all_credentials()
+
+    def detach_all_credentials(self, batch_size: int = 1000) -> Iterator[int]:
+        with self._lock:
+            self._publish(OP_CLEAR)
+            reclaimer = self._inner.detach_all_credentials(batch_size)
+        return reclaimer
+
+    def credential_exists(self, service: str, user: str) -> bool:
+        return self._inner.credential_exists(service, user)
+
+    def change_counter(self) -> int | None:
+        return self._inner.change_counter()
+
+    def changes_since(self, counter: int | None) -> tuple[int | None, list[tuple[str, str]] | None]:
+        return self._inner.changes_since(counter)
+
+    def write_snapshot(self, path: str) -> int:
+        """
+        Escribe una foto consistente del almacén junto con la secuencia y el
+        desplazamiento del flujo a los que corresponde. Las réplicas nuevas
+        arrancan de la foto y solo aplican los cambios posteriores.
+
+        Returns:
+            El número de secuencia de la foto.
+        """
+        with self._lock:
+            credentials = [
+                [service, user, _encode_hash(self._inner.get_credential(service, user))]
+                for service in self._inner.list_services()
+                for user in self._inner.list_users(service)
+            ]
+            offset = self._change_log.end_offset()
+            tail = _line_ending_at(self._change_log.path, offset) if offset else b""
+            snapshot = {
+                "seq": self._sequence,
+                "offset": offset,
+                "tail": tail.decode('ascii'),
+                "credentials": credentials,
+            }
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        logging.info(f"PublishingStorage: Snapshot written at sequence {snapshot['seq']} with {len(credentials)} credential(s).")
+        return snapshot["seq"]
+
+
+class ReplicaStorageStrategy(StorageStrategy):
+    """
+    Réplica de solo lectura que aplica de forma incremental el flujo de
+    cambios de un primario. Puede arrancar desde una foto (snapshot) para no
+    reprocesar el flujo completo.
+    """
+
+    def __init__(self, change_log_path: str, snapshot_path: str | None = None, auto_sync: bool = True):
+        """
+        Args:
+            change_log_path (str): Ruta del flujo de cambios del primario.
+            snapshot_path (str | None): Foto desde la que arrancar, si existe.
+            auto_sync (bool): Si es True, cada lectura aplica antes los cambios pendientes.
+        """
+        self._change_log_path = change_log_path
+        self._auto_sync = auto_sync
+        self._lock = threading.Lock()
+        self._data_store: dict[str, dict[str, bytes]] = {}
+        self._sequence = 0
+        self._offset = 0
+        # (dispositivo, inodo) del flujo que se está siguiendo, para detectar que se ha recreado
+        self._log_id: tuple[int, int] | None = None
+        # Última línea aplicada; debe seguir justo antes de _offset (None: aún no se conoce)
+        self._tail: bytes | None = b""
+        # (secuencia, (servicio, usuario)) de los últimos cambios aplicados; None en lugar del par si fue un vaciado
+        self._recent: deque[tuple[int, tuple[str, str] | None]] = deque(maxlen=RECENT_CHANGES)
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self._load_snapshot(snapshot_path)
+        self.sync()
+        logging.info(f"ReplicaStorageStrategy initialized at sequence {self._sequence}.")
+
+    @property
+    def last_sequence(self) -> int:
+        """Número de secuencia del último cambio aplicado."""
+        return self._sequence
+
+    def _load_snapshot(self, snapshot_path: str) -> None:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        for service, user, encoded in snapshot["credentials"]:
+            self._data_store.setdefault(service, {})[user] = _decode_hash(encoded)
+        self._sequence = snapshot["seq"]
+        self._offset = snapshot["offset"]
+        # Las fotos antiguas no guardan la última línea: se compara solo su secuencia
+        self._tail = snapshot["tail"].encode('ascii') if "tail" in snapshot else None
+        logging.info(f"ReplicaStorage: Snapshot loaded at sequence {self._sequence}.")
+
+    def _apply(self, change: dict) -> None:
+        op = change["op"]
+        if op == OP_ADD:
+            self._data_store.setdefault(change["service"], {})[change["user"]] = _decode_hash(change["hashed_password"])
+        elif op == OP_REMOVE:
+            users = self._data_store.get(change["service"], {})
+            users.pop(change["user"], None)
+            if not users:
+                self._data_store.pop(change["service"], None)
+        elif op == OP_CLEAR:
+            self._data_store = {}
+
+    def sync(self) -> int:
+        """
+        Aplica los cambios publicados desde la última sincronización.
+
+        Returns:
+            El número de cambios aplicados.
+
+        Raises:
+            ErrorReplicaDesincronizada: Si falta algún cambio en el flujo o si el
+                fichero se ha truncado o recreado. La réplica no puede seguir y hay
+                que volver a crearla desde una foto actual.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self._change_log_path)
+            except FileNotFoundError:
+                if self._offset or self._log_id is not None:
+                    self._desync("the change log has been removed")
+                return 0
+            log_id = (stat.st_dev, stat.st_ino)
+            if self._log_id is None:
+                self._log_id = log_id
+            elif log_id != self._log_id:
+                self._desync("the change log has been recreated")
+            if stat.st_size < self._offset:
+                self._desync(f"the change log shrank below offset {self._offset}")
+            if stat.st_size == self._offset:
+                return 0
+            try:
+                lines = self._read_pending()
+                changes = [json.loads(line) for line in lines]
+            except FileNotFoundError:
+                self._desync("the change log has been removed")
+            except ValueError:
+                self._desync(f"unreadable change at offset {self._offset}")
+            applied = 0
+            for line, change in zip(lines, changes):
+                if change["seq"] != self._sequence + 1:
+                    self._desync(f"gap in change stream, expected {self._sequence + 1} but got {change['seq']}")
+                self._apply(change)
+                self._sequence = change["seq"]
+                self._recent.append((self._sequence, None if change["op"] == OP_CLEAR else (change["service"], change["user"])))
+                self._offset += len(line)
+                self._tail = line
+                applied += 1
+            if applied:
+                logging.debug(f"ReplicaStorage: Applied {applied} change(s), now at sequence {self._sequence}.")
+            return applied
+
+    def _read_pending(self) -> list[bytes]:
+        """
+        Lee las líneas completas posteriores a _offset comprobando antes que lo
+        que hay justo delante sigue siendo la última línea aplicada: si el flujo
+        se ha recreado, el desplazamiento ya no apunta al mismo sitio.
+        """
+        if self._tail is None:
+            tail = _line_ending_at(self._change_log_path, self._offset) if self._offset else b""
+            if tail is None or (tail and json.loads(tail)["seq"] != self._sequence):
+                self._desync(f"the change log does not match the snapshot at sequence {self._sequence}")
+            self._tail = tail
+        with open(self._change_log_path, 'rb') as f:
+            f.seek(self._offset - len(self._tail))
+            data = f.read()
+        if not data.startswith(self._tail):
+            self._desync("the change log has been recreated")
+        data = data[len(self._tail):]
+        end = data.rfind(b'\n') + 1
+        return data[:end].splitlines(keepends=True)
+
+    def _desync(self, reason: str):
+        logging.error(f"ReplicaStorage: Out of sync at sequence {self._sequence}: {reason}.")
+        raise ErrorReplicaDesincronizada(f"La réplica no puede seguir el flujo de cambios ({reason}); hay que recrearla desde una foto.")
+
+    def wait_for_sequence(self, sequence: int, timeout: float = 5.0, poll_interval: float = 0.01) -> bool:
+        """
+        Espera a que la réplica haya aplicado al menos el cambio `sequence`.
+        Permite leer lo propio: tras escribir en el primario, se espera a su
+        `last_sequence` antes de verificar en la réplica.
+
+        Returns:
+            True si se alcanzó la secuencia antes del timeout, False en caso contrario.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.sync()
+            if self._sequence >= sequence:
+                return True
+            if time.monotonic() >= deadline:
+                logging.warning(f"ReplicaStorage: Timed out waiting for sequence {sequence} (at {self._sequence}).")
+                return False
+            time.sleep(poll_interval)
+
+    def _read_only(self, operation: str):
+        logging.warning(f"ReplicaStorage: Attempt to {operation} on a read-only replica.")
+        raise ErrorReplicaSoloLectura(f"No se puede '{operation}' en una réplica de solo lectura.")
+
+    def add_credential(self, service: str, user: str, hashed_password: bytes) -> None:
+        self._read_only("add_credential")
+
+    def get_credential(self, service: str, user: str) -> bytes | None:
+        if self._auto_sync:
+            self.sync()
+        return self._data_store.get(service, {}).get(user)
+
+    def remove_credential(self, service: str, user: str) -> bool:
+        self._read_only("remove_credential")
+
+    def list_services(self) -> list[str]:
+        if self._auto_sync:
+            self.sync()
+        return list(self._data_store.keys())
+
+    def list_users(self, service: str) -> list[str]:
+        if self._auto_sync:
+            self.sync()
+        return list(self._data_store.get(service, {}).keys())
+
+    def clear_all_credentials(self) -> None:
+        self._read_only("clear_all_credentials")
+
+    def detach_all_credentials(self, batch_size: int = 1000) -> Iterator[int]:
+        self._read_only("detach_all_credentials")
+
+    def credential_exists(self, service: str, user: str) -> bool:
+        if self._auto_sync:
+            self.sync()
+        return user in self._data_store.get(service, {})
+
+    def change_counter(self) -> int:
+        # El contenido de la réplica cambia al aplicar el flujo, no por escrituras propias
+        if self._auto_sync:
+            self.sync()
+        return self._sequence
+
+    def changes_since(self, counter: int | None) -> tuple[int, list[tuple[str, str]] | None]:
+        if self._auto_sync:
+            self.sync()
+        with self._lock:
+            if counter == self._sequence:
+                return counter, []
+            recent = list(self._recent)
+            # Solo se puede responder si los cambios posteriores a `counter` siguen en la memoria reciente
+            if counter is None or counter > self._sequence or not recent or recent[0][0] > counter + 1:
+                return self._sequence, None
+            keys = [key for sequence, key in recent if sequence > counter]
+            return self._sequence, (None if None in keys else keys)
@@ -0,0 +1,482 @@
+# src/gestor_credenciales/shared_file_storage.py
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - plataformas sin POSIX (Windows)
+    fcntl = None
+
+from .exceptions import ErrorCredencialExistente
+from .storage import StorageStrategy
+
+# Cabecera: magic | generación | fin de datos | época | inicio de la tabla | inicio de la cola
+MAGIC = b"GCVAULT3"
+HEADER = struct.Struct("<8sQQQQQ")
+HEADER_SIZE = HEADER.size
+_GENERATION_OFFSET = 8
+_END_OFFSET = 16
+_EPOCH_OFFSET = 24
+# Fin, época, inicio de la tabla e inicio de la cola se publican juntos con una única escritura
+_FIELDS = struct.Struct("<QQQQ")
+
+# Registro: operación | longitud servicio | longitud usuario | longitud hash
+RECORD = struct.Struct("<BHHH")
+OP_ADD = 1
+OP_REMOVE = 2
+
+# Se compacta cuando la cola ocupa más que esto y que una fracción de la tabla
+COMPACT_MIN_TAIL_BYTES = 64 * 1024
+COMPACT_TAIL_FRACTION = 8
+
+# Reintentos de un lector ante una generación impar antes de suponer que el escritor ha muerto
+READ_SPIN_LIMIT = 1000
+
+_U64 = struct.Struct("<Q")
+_U64_MASK = (1 << 64) - 1
+_MISSING = object()
+# Errores al leer un rango que una compactación está reescribiendo
+_TORN_READ_ERRORS = (struct.error, UnicodeDecodeError, ValueError, IndexError, OverflowError)
+
+
+class SharedFileStorageStrategy(StorageStrategy):
+    """
+    Almacén de credenciales en un fichero compartido por varios procesos del mismo host.
+
+    Tras la cabecera, el rango vigente [inicio, fin) tiene dos partes: una
+    tabla con las credenciales ordenadas por (servicio, usuario) y un índice
+    de desplazamientos, y una cola con las altas y bajas posteriores. Las
+    búsquedas se hacen por bisección directamente sobre el mmap de la tabla,
+    así que los procesos comparten la caché de páginas del sistema y cada uno
+    solo guarda en memoria lo que ha leído de la cola. Cuando la cola crece
+    demasiado, se compacta en una tabla nueva.
+
+    Las lecturas no toman el cerrojo de fichero: leen la cabecera (un seqlock
+    con contador de generación) y solo reprocesan la parte nueva de la cola.
+    Las escrituras toman un cerrojo flock sobre el descriptor propio de la
+    instancia el tiempo justo de añadir un registro y publicar la nueva
+    generación. Como flock pertenece a la descripción de fichero abierta, dos
+    instancias sobre la misma ruta se excluyen aunque estén en el mismo
+    proceso. La compactación escribe la tabla nueva fuera del rango vigente y
+    solo después mueve la cabecera, así que una caída a medias nunca deja
+    visibles datos mezclados.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        """
+        Abre (o crea) el fichero del almacén.
+
+        Args:
+            path (str): Ruta del fichero compartido.
+            fsync (bool): Si es True, fuerza a disco cada escritura.
+
+        Raises:
+            NotImplementedError: Si la plataforma no dispone de fcntl.
+            ValueError: Si el fichero existe pero no tiene el formato esperado.
+        """
+        if fcntl is None:
+            raise NotImplementedError("SharedFileStorageStrategy requiere fcntl (sistemas POSIX).")
+        self._path = path
+        self._fsync = fsync
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._mmap = None
+        # Cambios de la cola sobre la tabla: servicio -> usuario -> hash, o None si se dio de baja
+        self._overlay: dict[str, dict[str, bytes | None]] = {}
+        self._generation = -1
+        self._epoch = -1
+        self._start = HEADER_SIZE
+        self._tail = HEADER_SIZE
+        self._offset = HEADER_SIZE
+        self._count = 0
+        with self._write_lock():
+            if os.fstat(self._fd).st_size < HEADER_SIZE:
+                os.pwrite(self._fd, HEADER.pack(MAGIC, 0, HEADER_SIZE, 0, HEADER_SIZE, HEADER_SIZE), 0)
+            compatible = os.pread(self._fd, len(MAGIC), 0) == MAGIC
+        if not compatible:
+            self.close()
+            raise ValueError(f"'{path}' no es un almacén de SharedFileStorageStrategy compatible.")
+        self._refresh()
+        logging.info(f"SharedFileStorageStrategy initialized at {path} (generation {self._generation}).")
+
+    @property
+    def generation(self) -> int:
+        """Generación del fichero vista por este proceso tras la última lectura."""
+        return self._generation
+
+    def change_counter(self) -> int:
+        """
+        Época y fin de los datos vigentes en un solo entero, leídos de la cabecera
+        sin cerrojo (con pread) ni reprocesar registros. Solo cambia si cambian los datos.
+        """
+        _, _, _, end, epoch = self._read_header()
+        return epoch << 64 | end
+
+    def changes_since(self, counter: int | None) -> tuple[int, list[tuple[str, str]] | None]:
+        """
+        Dentro de una misma época, lo modificado son los registros de la cola
+        posteriores a `counter`. Tras una compactación no se puede saber.
+        """
+        _, _, tail, end, epoch = self._read_header()
+        current = epoch << 64 | end
+        if counter == current:
+            return current, []
+        if counter is None or counter >> 64 != epoch or not tail <= counter & _U64_MASK <= end:
+            return current, None
+        try:
+            changes = self._parse(self._map(end), counter & _U64_MASK, end)
+        except _TORN_READ_ERRORS:
+            changes = None
+        if changes is None or self._read_u64(_EPOCH_OFFSET) != epoch:
+            return current, None
+        return current, [(service, user) for _, service, user, _ in changes]
+
+    # --- Cerrojos y cabecera ---
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock:
+            if self._lock_depth:
+                # Reentrada desde el mismo hilo: el flock ya es nuestro
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._lock_depth = 1
+            try:
+                if os.fstat(self._fd).st_size >= HEADER_SIZE:
+                    generation = self._read_u64(_GENERATION_OFFSET)
+                    if generation % 2:
+                        # Un escritor murió publicando la cabecera; se cierra su generación
+                        logging.warning("SharedFileStorage: Recovering from an interrupted write.")
+                        self._write_u64(_GENERATION_OFFSET, generation + 1)
+                yield
+            finally:
+                self._lock_depth = 0
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _map(self, size: int) -> mmap.mmap:
+        if self._mmap is None or len(self._mmap) < size:
+            # El mmap anterior no se cierra: otro hilo puede estar leyéndolo todavía y se
+            # libera solo cuando nadie lo referencia
+            self._mmap = mmap.mmap(self._fd, os.fstat(self._fd).st_size, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _read_u64(self, offset: int) -> int:
+        return _U64.unpack(os.pread(self._fd, _U64.size, offset))[0]
+
+    def _write_u64(self, offset: int, value: int) -> None:
+        os.pwrite(self._fd, _U64.pack(value), offset)
+
+    def _read_header(self) -> tuple[int, int, int, int, int]:
+        """
+        Lee (generación, inicio, cola, fin, época) de forma consistente, sin cerrojo (seqlock).
+        Usa pread y no el mmap, así que cualquier hilo puede llamarlo en cualquier momento.
+        """
+        spins = 0
+        while True:
+            _, generation, end, epoch, start, tail = HEADER.unpack(os.pread(self._fd, HEADER_SIZE, 0))
+            if generation % 2:
+                spins += 1
+                if spins < READ_SPIN_LIMIT:
+                    time.sleep(0)  # Hay un escritor publicando; se reintenta
+                else:
+                    # El escritor puede haber muerto: tomar el cerrojo espera al vivo o repara la cabecera
+                    with self._write_lock():
+                        pass
+                    spins = 0
+                continue
+            if self._read_u64(_GENERATION_OFFSET) == generation:
+                return generation, start, tail, end, epoch
+
+    def _write_data(self, data: bytes, offset: int) -> None:
+        os.pwrite(self._fd, data, offset)
+        if self._fsync:
+            # Los datos tienen que estar en disco antes de que la cabecera los publique
+            os.fsync(self._fd)
+
+    def _publish_header(self, generation: int, start: int, tail: int, end: int, epoch: int) -> None:
+        """Publica tabla, cola, fin y época nuevos. Solo se llama con el cerrojo de escritura."""
+        self._write_u64(_GENERATION_OFFSET, generation + 1)
+        os.pwrite(self._fd, _FIELDS.pack(end, epoch, start, tail), _END_OFFSET)
+        self._write_u64(_GENERATION_OFFSET, generation + 2)
+        if self._fsync:
+            os.fsync(self._fd)
+
+    # --- Tabla ordenada ---
+
+    @staticmethod
+    def _entry(mm: mmap.mmap, start: int, count: int, index: int) -> tuple[bytes, bytes, int, int]:
+        """Devuelve (servicio, usuario, posición del hash, longitud del hash) de la entrada `index` de la tabla."""
+        record = start + _U64.size * (1 + count) + _U64.unpack_from(mm, start + _U64.size * (1 + index))[0]
+        _, service_len, user_len, hash_len = RECORD.unpack_from(mm, record)
+        pos = record + RECORD.size
+        return mm[pos:pos + service_len], mm[pos + service_len:pos + service_len + user_len], pos + service_len + user_len, hash_len
+
+    def _service_end(self, mm: mmap.mmap, start: int, count: int, service: bytes, lo: int) -> int:
+        """Final del bloque de entradas de `service`, que empieza en `lo`."""
+        def service_at(index):
+            return self._entry(mm, start, count, index)[0]
+        # Búsqueda exponencial: cuesta según los usuarios del servicio, no según la tabla
+        step = 1
+        while lo + step < count and service_at(lo + step) == service:
+            step *= 2
+        return bisect_right(range(count), service, lo=lo + step // 2, hi=min(count, lo + step), key=service_at)
+
+    def _service_range(self, mm: mmap.mmap, start: int, count: int, service: bytes) -> tuple[int, int]:
+        """Rango [lo, hi) de entradas de la tabla que pertenecen a `service`."""
+        lo = bisect_left(range(count), service, key=lambda index: self._entry(mm, start, count, index)[0])
+        return lo, self._service_end(mm, start, count, service, lo)
+
+    def _table_get(self, mm: mmap.mmap, start: int, count: int, service: bytes, user: bytes) -> bytes | None:
+        key = (service, user)
+        index = bisect_left(range(count), key, key=lambda i: self._entry(mm, start, count, i)[:2])
+        if index == count:
+            return None
+        found_service, found_user, hash_pos, hash_len = self._entry(mm, start, count, index)
+        if (found_service, found_user) != key:
+            return None
+        return mm[hash_pos:hash_pos + hash_len]
+
+    def _table_users(self, mm: mmap.mmap, start: int, count: int, lo: int, hi: int) -> list[str]:
+        return [self._entry(mm, start, count, index)[1].decode('utf-8') for index in range(lo, hi)]
+
+    # --- Lectura incremental de la cola ---
+
+    @staticmethod
+    def _parse(mm: mmap.mmap, start: int, end: int) -> list[tuple[int, str, str, bytes]]:
+        changes = []
+        offset = start
+        while offset < end:
+            op, service_len, user_len, hash_len = RECORD.unpack_from(mm, offset)
+            pos = offset + RECORD.size
+            service = mm[pos:pos + service_len].decode('utf-8')
+            pos += service_len
+            user = mm[pos:pos + user_len].decode('utf-8')
+            pos += user_len
+            changes.append((op, service, user, mm[pos:pos + hash_len] if op == OP_ADD else None))
+            offset = pos + hash_len
+        return changes
+
+    def _refresh(self) -> None:
+        """Incorpora los cambios de otros procesos si la generación ha cambiado."""
+        with self._lock:
+            while True:
+                generation, start, tail, end, epoch = self._read_header()
+                if generation == self._generation:
+                    return
+                same_epoch = epoch == self._epoch and end >= self._offset
+                mm = self._map(end)
+                try:
+                    changes = self._parse(mm, self._offset if same_epoch else tail, end)
+                    count = _U64.unpack_from(mm, start)[0] if tail > start else 0
+                except _TORN_READ_ERRORS:
+                    if self._read_u64(_EPOCH_OFFSET) == epoch:
+                        raise
+                    changes = None
+                if changes is None or self._read_u64(_EPOCH_OFFSET) != epoch:
+                    # Una compactación reescribió los datos mientras leíamos
+                    self._epoch = -1
+                    continue
+                # Una época nueva empieza con otro diccionario: quien aún use el anterior no ve mezclas
+                overlay = self._overlay if same_epoch else {}
+                for op, service, user, hashed_password in changes:
+                    overlay.setdefault(service, {})[user] = hashed_password
+                self._overlay = overlay
+                self._generation, self._start, self._tail, self._offset, self._epoch = generation, start, tail, end, epoch
+                self._count = count
+                logging.debug(f"SharedFileStorage: Refreshed to generation {generation}.")
+                return
+
+    def _view(self) -> tuple[int, int, int, dict[str, dict[str, bytes | None]], mmap.mmap]:
+        """Estado coherente para una lectura: (época, inicio de la tabla, entradas, cola, mmap)."""
+        with self._lock:
+            self._refresh()
+            return self._epoch, self._start, self._count, self._overlay, self._mmap
+
+    def _read_table(self, read):
+        """
+        Ejecuta `read(mm, start, count, overlay)` sobre la tabla vigente y lo
+        repite si una compactación la ha movido entretanto.
+        """
+        while True:
+            epoch, start, count, overlay, mm = self._view()
+            try:
+                result = read(mm, start, count, overlay)
+            except _TORN_READ_ERRORS:
+                if self._read_u64(_EPOCH_OFFSET) == epoch:
+                    raise
+                continue
+            if self._read_u64(_EPOCH_OFFSET) == epoch:
+                return result
+
+    def _lookup(self, service: str, user: str) -> bytes | None:
+        def read(mm, start, count, overlay):
+            changed = overlay.get(service, {}).get(user, _MISSING)
+            if changed is not _MISSING:
+                return changed
+            return self._table_get(mm, start, count, service.encode('utf-8'), user.encode('utf-8'))
+        return self._read_table(read)
+
+    # --- Escritura ---
+
+    @staticmethod
+    def _pack(op: int, service: bytes, user: bytes, hashed_password: bytes = b"") -> bytes:
+        return RECORD.pack(op, len(service), len(user), len(hashed_password)) + service + user + hashed_password
+
+    def _encode(self, op: int, service: str, user: str, hashed_password: bytes = b"") -> bytes:
+        return self._pack(op, service.encode('utf-8'), user.encode('utf-8'), hashed_password)
+
+    def _append(self, record: bytes) -> None:
+        """Añade un registro a la cola y publica la nueva generación. Requiere el cerrojo de escritura."""
+        generation, start, tail, end, epoch = self._read_header()
+        self._write_data(record, end)
+        self._publish_header(generation, start, tail, end + len(record), epoch)
+        self._refresh()
+        if end + len(record) - tail > max(COMPACT_MIN_TAIL_BYTES, (tail - start) // COMPACT_TAIL_FRACTION):
+            self._compact()
+
+    def _live_entries(self) -> Iterator[tuple[bytes, bytes, bytes]]:
+        """Credenciales vigentes en orden: la tabla mezclada con la cola. Requiere el cerrojo de escritura."""
+        mm, start, count = self._mmap, self._start, self._count
+        changes = sorted(
+            (service.encode('utf-8'), user.encode('utf-8'), hashed_password)
+            for service, users in self._overlay.items()
+            for user, hashed_password in users.items()
+        )
+        position = 0
+        for index in range(count):
+            service, user, hash_pos, hash_len = self._entry(mm, start, count, index)
+            while position < len(changes) and changes[position][:2] < (service, user):
+                if changes[position][2] is not None:
+                    yield changes[position]
+                position += 1
+            if position < len(changes) and changes[position][:2] == (service, user):
+                # La cola manda sobre la tabla: la entrada se dio de baja o se volvió a dar de alta
+                if changes[position][2] is not None:
+                    yield changes[position]
+                position += 1
+            else:
+                yield service, user, mm[hash_pos:hash_pos + hash_len]
+        for change in changes[position:]:
+            if change[2] is not None:
+                yield change
+
+    def _compact(self, entries: Iterator[tuple[bytes, bytes, bytes]] | None = None) -> None:
+        """
+        Escribe una tabla nueva con las credenciales vigentes y la publica con
+        la cola vacía. Requiere el cerrojo de escritura.
+
+        La tabla nueva nunca pisa el rango vigente [inicio, fin): va delante de
+        él si cabe y, si no, detrás. Hasta que la cabecera cambia, el fichero
+        sigue siendo válido tal como estaba.
+        """
+        generation, start, tail, end, epoch = self._read_header()
+        offsets = array('Q')
+        records = bytearray()
+        for service, user, hashed_password in (self._live_entries() if entries is None else entries):
+            offsets.append(len(records))
+            records += self._pack(OP_ADD, service, user, hashed_password)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        data = _U64.pack(len(offsets)) + offsets.tobytes() + records if offsets else b""
+        new_start = HEADER_SIZE if HEADER_SIZE + len(data) <= start else end
+        self._write_data(data, new_start)
+        # La nueva época hace que los lectores en curso descarten lo leído del rango anterior
+        new_end = new_start + len(data)
+        self._publish_header(generation, new_start, new_end, new_end, epoch + 1)
+        self._refresh()
+        logging.info(f"SharedFileStorage: Compacted {end - start} bytes into {len(data)}.")
+
+    def add_credential(self, service: str, user: str, hashed_password: bytes) -> None:
+        with self._write_lock():
+            if self._lookup(service, user) is not None:
+                logging.warning(f"SharedFileStorage: Attempt to add duplicate credential for {service} - {user}")
+                raise ErrorCredencialExistente(f"Ya existe una credencial para el servicio '{service}' y usuario '{user}' en SharedFileStorage.")
+            self._append(self._encode(OP_ADD, service, user, hashed_password))
+        logging.info(f"SharedFileStorage: Credential added for {service} - {user}")
+
+    def get_credential(self, service: str, user: str) -> bytes | None:
+        credential = self._lookup(service, user)
+        if credential:
+            logging.debug(f"SharedFileStorage: Credential retrieved for {service} - {user}")
+        else:
+            logging.debug(f"SharedFileStorage: Credential not found for {service} - {user}")
+        return credential
+
+    def remove_credential(self, service: str, user: str) -> bool:
+        with self._write_lock():
+            if self._lookup(service, user) is None:
+                logging.warning(f"SharedFileStorage: Attempt to remove non-existent credential for {service} - {user}")
+                return False
+            self._append(self._encode(OP_REMOVE, service, user))
+        logging.info(f"SharedFileStorage: Credential removed for {service} - {user}")
+        return True
+
+    def list_services(self) -> list[str]:
+        def read(mm, start, count, overlay):
+            with self._lock:
+                changes = {service: dict(users) for service, users in overlay.items()}
+            services = []
+            index = 0
+            while index < count:
+                service = self._entry(mm, start, count, index)[0]
+                lo, hi = index, self._service_end(mm, start, count, service, index)
+                name = service.decode('utf-8')
+                changed = changes.pop(name, {})
+                # Con menos cambios que entradas no pueden haberse dado de baja todas
+                if (hi - lo > len(changed)
+                        or any(hashed_password is not None for hashed_password in changed.values())
+                        or any(user not in changed for user in self._table_users(mm, start, count, lo, hi))):
+                    services.append(name)
+                index = hi
+            services.extend(
+                service for service, users in changes.items()
+                if any(hashed_password is not None for hashed_password in users.values())
+            )
+            return services
+        services = self._read_table(read)
+        logging.debug(f"SharedFileStorage: Listed services: {services}")
+        return services
+
+    def list_users(self, service: str) -> list[str]:
+        def read(mm, start, count, overlay):
+            with self._lock:
+                changed = dict(overlay.get(service, {}))
+            lo, hi = self._service_range(mm, start, count, service.encode('utf-8'))
+            users = [user for user in self._table_users(mm, start, count, lo, hi) if user not in changed]
+            return users + [user for user, hashed_password in changed.items() if hashed_password is not None]
+        return self._read_table(read)
+
+    def clear_all_credentials(self) -> None:
+        # Vaciar es una compactación sin credenciales: no depende del tamaño del fichero
+        with self._write_lock():
+            self._compact(iter(()))
+        logging.info("SharedFileStorage: All credentials cleared.")
+
+    def credential_exists(self, service: str, user: str) -> bool:
+        exists = self._lookup(service, user) is not None
+        logging.debug(f"SharedFileStorage: Credential check for {service} - {user}: {'Exists' if exists else 'Does not exist'}")
+        return exists
+
+    def close(self) -> None:
+        """Libera el mmap y el descriptor del fichero."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            os.close(self._fd)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 import logging
 from .exceptions import ErrorCredencialExistente
 
@@ -54,6 +55,19 @@ class StorageStrategy(ABC):
         """
         pass
 
+    def list_users(self, service: str) -> list[str]:
+        """
+        Lista los usuarios con credencial almacenada para un servicio.
+        No es abstracto para no romper estrategias existentes; las que lo
+        soporten deben sobrescribirlo (lo necesitan, por ejemplo, los snapshots
+        de replicación).
+        Args:
+            service: El nombre del servicio.
+        Returns:
+            Una lista de nombres de usuario (vacía si el servicio no existe).
+        """
+        raise NotImplementedError(f"{type(self).__name__} no permite enumerar usuarios.")
+
     @abstractmethod
     def clear_all_credentials(self) -> None:
         """
@@ -61,6 +75,45 @@ class StorageStrategy(ABC):
         """
         pass
 
+    def detach_all_credentials(self, batch_size: int = 1000) -> Iterator[int]:
+        """
+        Invalida de golpe todas las credenciales y deja el borrado físico para después.
+        Tras la llamada el almacén se comporta como vacío; el iterador devuelto
+        libera las credenciales antiguas por lotes y puede consumirse en segundo plano.
+        Por defecto vacía el almacén de forma síncrona y no queda nada por liberar.
+        Args:
+            batch_size: Número de credenciales liberadas en cada paso del iterador.
+        Returns:
+            Un iterador que, en cada paso, devuelve cuántas credenciales ha liberado.
+        """
+        self.clear_all_credentials()
+        return iter(())
+
+    def change_counter(self) -> int | None:
+        """
+        Contador que cambia con cada escritura en el almacén, incluidas las
+        hechas por otras instancias o procesos. Permite a una caché por encima
+        saber si lo que guarda sigue vigente.
+        Por defecto devuelve None: el almacén solo cambia a través de esta instancia.
+        Returns:
+            El valor actual del contador, o None si el almacén no lo ofrece.
+        """
+        return None
+
+    def changes_since(self, counter: int | None) -> tuple[int | None, list[tuple[str, str]] | None]:
+        """
+        Credenciales modificadas desde que change_counter() devolvió `counter`.
+        Permite a una caché invalidar solo lo que ha cambiado en lugar de vaciarse entera.
+        Por defecto no sabe enumerarlas: si el contador se ha movido, devuelve None.
+        Args:
+            counter: Un valor devuelto antes por change_counter() o por este método.
+        Returns:
+            El contador actual y la lista de pares (servicio, usuario) modificados desde
+            `counter`, o None en lugar de la lista si no se puede saber cuáles son.
+        """
+        current = self.change_counter()
+        return current, ([] if current == counter else None)
+
     @abstractmethod
     def credential_exists(self, service: str, user: str) -> bool:
         """
@@ -117,10 +170,35 @@ class InMemoryStorageStrategy(StorageStrategy):
         logging.debug(f"InMemoryStorage: Listed services: {services}")
         return services
 
+    def list_users(self, service: str) -> list[str]:
+        users = list(self._data_store.get(service, {}).keys())
+        logging.debug(f"InMemoryStorage: Listed users for {service}: {users}")
+        return users
+
     def clear_all_credentials(self) -> None:
         self._data_store = {}
         logging.info("InMemoryStorage: All credentials cleared.")
 
+    def detach_all_credentials(self, batch_size: int = 1000) -> Iterator[int]:
+        old_data_store = self._data_store
+        self._data_store = {}
+        logging.info("InMemoryStorage: All credentials detached for background reclamation.")
+        return self._reclaim(old_data_store, batch_size)
+
+    @staticmethod
+    def _reclaim(old_data_store: dict[str, dict[str, bytes]], batch_size: int) -> Iterator[int]:
+        freed = 0
+        while old_data_store:
+            _, users = old_data_store.popitem()
+            while users:
+                users.popitem()
+                freed += 1
+                if freed >= batch_size:
+                    yield freed
+                    freed = 0
+        if freed:
+            yield freed
+
     def credential_exists(self, service: str, user: str) -> bool:
         exists = service in self._data_store and user in self._data_store[service]
         logging.debug(f"InMemoryStorage: Credential check for {service} - {user}: {'Exists' if exists else 'Does not exist'}")
@@ -0,0 +1,254 @@
+# src/gestor_credenciales/tiered_storage.py
+
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+
+from .storage import StorageStrategy
+
+_COUNTER_MAX = 15
+# Multiplicadores impares de 64 bits: una fila del sketch por cada uno
+_SKETCH_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+_MASK_64 = (1 << 64) - 1
+# Tabla para bytearray.translate: divide cada contador entre dos en C, sin recorrerlos en Python
+_HALVE_TABLE = bytes(value >> 1 for value in range(256))
+
+
+class _FrequencySketch:
+    """
+    Count-Min Sketch con contadores saturados en 15 (como TinyLFU).
+    Cada `sample_size` incrementos se dividen todos los contadores entre dos,
+    de modo que la frecuencia estimada refleja el uso reciente.
+    """
+
+    def __init__(self, width: int, sample_size: int):
+        self._bits = max(6, (width - 1).bit_length())
+        self._rows = [bytearray(1 << self._bits) for _ in _SKETCH_SEEDS]
+        self._sample_size = sample_size
+        self._additions = 0
+
+    def _indexes(self, key: tuple[str, str]) -> Iterator[int]:
+        base = hash(key) & _MASK_64
+        for seed in _SKETCH_SEEDS:
+            yield ((base * seed) & _MASK_64) >> (64 - self._bits)
+
+    def increment(self, key: tuple[str, str]) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < _COUNTER_MAX:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self.age()
+
+    def frequency(self, key: tuple[str, str]) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def age(self) -> None:
+        for row in self._rows:
+            row[:] = row.translate(_HALVE_TABLE)
+        self._additions //= 2
+
+
+class TieredStorageStrategy(StorageStrategy):
+    """
+    Estrategia en dos niveles: una caché en memoria acotada sobre cualquier
+    StorageStrategy persistente.
+
+    Las escrituras van siempre al almacén persistente y además invalidan la
+    caché, así que ambos niveles no se contradicen nunca. Un fallo en la caché
+    solo promociona la credencial si su frecuencia de acceso estimada (TinyLFU)
+    supera a la de la víctima LRU que tendría que salir. Periódicamente se
+    envejecen las frecuencias y se degradan las entradas que se han enfriado.
+
+    Si el almacén persistente lo comparten varios procesos, cada lectura
+    comprueba antes su contador de cambios (change_counter). Cuando se mueve,
+    se sacan del nivel en memoria las credenciales que el almacén dice haber
+    cambiado (changes_since), de modo que una credencial revocada por otro
+    proceso nunca se sigue sirviendo desde la caché. Las escrituras propias
+    aparecen ahí también, pero ya se habían invalidado al hacerlas. Si el
+    almacén no sabe decir qué ha cambiado, el nivel en memoria se vacía
+    entero. Con almacenes sin contador se supone que solo cambian a través de
+    esta instancia.
+    """
+
+    def __init__(self, backend: StorageStrategy, capacity: int = 1024, sample_factor: int = 10):
+        """
+        Args:
+            backend (StorageStrategy): Almacén persistente (nivel frío).
+            capacity (int): Número máximo de credenciales en memoria (nivel caliente).
+            sample_factor (int): Se envejecen las frecuencias cada `capacity * sample_factor` accesos.
+
+        Raises:
+            ValueError: Si la capacidad no es positiva.
+        """
+        if capacity < 1:
+            raise ValueError("La capacidad del nivel en memoria debe ser positiva.")
+        self._backend = backend
+        self._capacity = capacity
+        self._hot: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._sketch = _FrequencySketch(capacity * 4, capacity * sample_factor)
+        self._lock = threading.RLock()
+        self._version = 0
+        self._backend_counter = backend.change_counter()
+        self._stats = {"hits": 0, "misses": 0, "admissions": 0, "rejections": 0, "evictions": 0, "demotions": 0,
+                       "invalidations": 0}
+        self._demotion_thread: threading.Thread | None = None
+        self._stop_demotion = threading.Event()
+        logging.info(f"TieredStorageStrategy initialized over {type(backend).__name__} with capacity {capacity}.")
+
+    # --- Promoción y degradación ---
+
+    def _sync_backend(self) -> None:
+        """Saca del nivel en memoria lo que ha cambiado en el almacén desde la última vez. Sin el cerrojo."""
+        since = self._backend_counter
+        if self._backend.change_counter() == since:
+            return
+        counter, keys = self._backend.changes_since(since)
+        with self._lock:
+            # Lo leído del almacén antes de este punto puede estar obsoleto: no se promociona
+            self._version += 1
+            if keys is None:
+                self._stats["invalidations"] += len(self._hot)
+                self._hot.clear()
+            else:
+                for key in keys:
+                    if self._hot.pop(key, None) is not None:
+                        self._stats["invalidations"] += 1
+            # Si otro hilo ya avanzó el contador, su valor se queda: a lo sumo se repite una invalidación
+            if self._backend_counter == since:
+                self._backend_counter = counter
+
+    def _admit(self, key: tuple[str, str], hashed_password: bytes) -> None:
+        """Intenta subir una credencial al nivel en memoria. Requiere el cerrojo."""
+        if len(self._hot) >= self._capacity:
+            victim = next(iter(self._hot))
+            if self._sketch.frequency(key) <= self._sketch.frequency(victim):
+                self._stats["rejections"] += 1
+                return
+            del self._hot[victim]
+            self._stats["evictions"] += 1
+        self._hot[key] = hashed_password
+        self._stats["admissions"] += 1
+
+    def demote_cold(self, min_frequency: int = 1) -> int:
+        """
+        Saca del nivel en memoria las credenciales cuya frecuencia estimada ha
+        caído por debajo de `min_frequency`.
+
+        Returns:
+            El número de credenciales degradadas.
+        """
+        with self._lock:
+            cold = [key for key in self._hot if self._sketch.frequency(key) < min_frequency]
+            for key in cold:
+                del self._hot[key]
+            self._stats["demotions"] += len(cold)
+        if cold:
+            logging.debug(f"TieredStorage: Demoted {len(cold)} cold credential(s).")
+        return len(cold)
+
+    def _demotion_loop(self, interval: float, min_frequency: int) -> None:
+        while not self._stop_demotion.wait(interval):
+            with self._lock:
+                self._sketch.age()
+            self.demote_cold(min_frequency)
+
+    def start_background_demotion(self, interval: float = 60.0, min_frequency: int = 1) -> None:
+        """Arranca un hilo que cada `interval` segundos envejece las frecuencias y degrada las entradas frías."""
+        if self._demotion_thread is not None and self._demotion_thread.is_alive():
+            return
+        self._stop_demotion.clear()
+        self._demotion_thread = threading.Thread(
+            target=self._demotion_loop,
+            args=(interval, min_frequency),
+            name="tiered-storage-demotion",
+            daemon=True
+        )
+        self._demotion_thread.start()
+
+    def stop_background_demotion(self) -> None:
+        self._stop_demotion.set()
+        if self._demotion_thread is not None:
+            self._demotion_thread.join()
+            self._demotion_thread = None
+
+    def stats(self) -> dict[str, float]:
+        """Estadísticas del nivel en memoria, incluida la tasa de aciertos."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["hot_size"] = len(self._hot)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    # --- StorageStrategy ---
+
+    # Las escrituras llaman al almacén sin el cerrojo para que los aciertos no esperen a su E/S.
+    # Al terminar se sube la versión, y así no se promociona lo leído antes de la escritura.
+
+    def add_credential(self, service: str, user: str, hashed_password: bytes) -> None:
+        self._backend.add_credential(service, user, hashed_password)
+        with self._lock:
+            self._version += 1
+            self._hot.pop((service, user), None)
+
+    def get_credential(self, service: str, user: str) -> bytes | None:
+        key = (service, user)
+        self._sync_backend()
+        with self._lock:
+            self._sketch.increment(key)
+            credential = self._hot.get(key)
+            if credential is not None:
+                self._hot.move_to_end(key)
+                self._stats["hits"] += 1
+                return credential
+            self._stats["misses"] += 1
+            version = self._version
+        # La lectura del nivel frío se hace sin el cerrojo para no bloquear los aciertos
+        credential = self._backend.get_credential(service, user)
+        if credential is not None:
+            with self._lock:
+                if version == self._version:  # Ninguna escritura intermedia la ha invalidado
+                    self._admit(key, credential)
+        return credential
+
+    def remove_credential(self, service: str, user: str) -> bool:
+        removed = self._backend.remove_credential(service, user)
+        with self._lock:
+            self._version += 1
+            self._hot.pop((service, user), None)
+        return removed
+
+    def list_services(self) -> list[str]:
+        return self._backend.list_services()
+
+    def list_users(self, service: str) -> list[str]:
+        return self._backend.list_users(service)
+
+    def clear_all_credentials(self) -> None:
+        self._backend.clear_all_credentials()
+        with self._lock:
+            self._version += 1
+            self._hot.clear()
+        logging.info("TieredStorage: All credentials cleared.")
+
+    def detach_all_credentials(self, batch_size: int = 1000) -> Iterator[int]:
+        reclaimer = self._backend.detach_all_credentials(batch_size)
+        with self._lock:
+            self._version += 1
+            self._hot.clear()
+        return reclaimer
+
+    def change_counter(self) -> int | None:
+        return self._backend.change_counter()
+
+    def changes_since(self, counter: int | None) -> tuple[int | None, list[tuple[str, str]] | None]:
+        return self._backend.changes_since(counter)
+
+    def credential_exists(self, service: str, user: str) -> bool:
+        self._sync_backend()
+        with self._lock:
+            if (service, user) in self._hot:
+                return True
+        return self._backend.credential_exists(service, user)
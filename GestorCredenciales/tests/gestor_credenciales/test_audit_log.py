@@ -0,0 +1,202 @@
+# tests/test_audit_log.py
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from unittest import mock
+from src.gestor_credenciales import audit_log
+from src.gestor_credenciales.audit_log import AuditLogIndex
+from src.gestor_credenciales.cli import main
+
+LINEAS = [
+    "2025-05-15 10:00:00 - INFO - Gestor de credenciales inicializado correctamente con InMemoryStorageStrategy.",
+    "2025-05-15 10:00:01 - INFO - Credencial añadida para servicio 'GitHub', usuario 'user1'.",
+    "2025-05-15 10:05:00 - INFO - Verificación de contraseña exitosa para servicio 'GitHub', usuario 'user1'.",
+    "2025-05-15 10:10:00 - WARNING - Verificación de contraseña fallida para servicio 'GitHub', usuario 'user1'.",
+    "2025-05-15 10:20:00 - WARNING - Verificación de contraseña fallida para servicio 'GitLab', usuario 'user1'.",
+    "2025-05-15 10:30:00 - WARNING - Intento de autenticación fallido con clave maestra incorrecta.",
+    "2025-05-15 11:00:00 - WARNING - Verificación de contraseña fallida para servicio 'GitHub', usuario 'user2'.",
+]
+
+
+class TestAuditLogIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tmp_dir, "gestor_credenciales.log")
+        self._escribir(self.log_path, LINEAS)
+        self.indice = AuditLogIndex(self.log_path)
+
+    def tearDown(self):
+        self.indice.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _escribir(self, path, lineas, modo='w', encoding='utf-8'):
+        with open(path, modo, encoding=encoding) as f:
+            for linea in lineas:
+                f.write(linea + "\n")
+
+    def test_filtra_por_servicio_y_evento(self):
+        eventos = self.indice.query(service="GitHub", event="verificacion_fallida")
+        self.assertEqual([evento.user for evento in eventos], ["user1", "user2"])
+        self.assertEqual(eventos[0].level, "WARNING")
+        self.assertEqual(eventos[0].timestamp, datetime(2025, 5, 15, 10, 10))
+        self.assertIn("fallida para servicio 'GitHub'", eventos[0].message)
+
+    def test_filtra_por_rango_de_tiempo(self):
+        eventos = self.indice.query(since=datetime(2025, 5, 15, 10, 5), until=datetime(2025, 5, 15, 10, 30))
+        self.assertEqual(len(eventos), 4)
+        self.assertEqual(eventos[-1].event, "autenticacion_fallida")
+        self.assertEqual(self.indice.query(since=datetime(2025, 5, 16)), [])
+
+    def test_filtros_sin_coincidencias_y_limite(self):
+        self.assertEqual(self.indice.query(service="Bitbucket"), [])
+        self.assertEqual(self.indice.query(user="user2", level="INFO"), [])
+        self.assertEqual(len(self.indice.query(level="WARNING", limit=2)), 2)
+
+    def test_indexacion_incremental_y_persistente(self):
+        self.assertEqual(self.indice.refresh(), len(LINEAS))
+        self.assertEqual(self.indice.refresh(), 0)
+        self._escribir(self.log_path, [
+            "2025-05-15 12:00:00 - WARNING - Verificación de contraseña fallida para servicio 'GitLab', usuario 'user3'.",
+        ], modo='a')
+        self.assertEqual(self.indice.refresh(), 1)
+
+        reabierto = AuditLogIndex(self.log_path)
+        self.assertEqual(reabierto.refresh(), 0)
+        self.assertEqual([e.user for e in reabierto.query(service="GitLab", refresh=False)], ["user1", "user3"])
+        reabierto.close()
+
+    def _fichero_lateral(self):
+        directorio = f"{self.log_path}.idx.d"
+        (nombre,) = os.listdir(directorio)
+        with open(os.path.join(directorio, nombre), 'rb') as f:
+            return f.read()
+
+    def test_indice_lateral_solo_crece_por_el_final(self):
+        self.indice.refresh()
+        antes = self._fichero_lateral()
+        for minuto in range(3):
+            self._escribir(self.log_path, [
+                f"2025-05-15 12:0{minuto}:00 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user{minuto}'.",
+            ], modo='a')
+            self.assertEqual(self.indice.refresh(), 1)
+        despues = self._fichero_lateral()
+        self.assertTrue(despues.startswith(antes))
+        reabierto = AuditLogIndex(self.log_path)
+        self.assertEqual(reabierto.refresh(), 0)
+        self.assertEqual([e.user for e in reabierto.query(event="credencial_eliminada")], ["user0", "user1", "user2"])
+        self.assertEqual(len(reabierto.query(service="GitHub")), 7)
+        reabierto.close()
+
+    def test_tramos_se_funden_al_superar_el_limite(self):
+        with mock.patch.object(audit_log, "MAX_SEGMENTS", 2):
+            self.indice.refresh()
+            for minuto in range(3):
+                self._escribir(self.log_path, [
+                    f"2025-05-15 12:0{minuto}:00 - WARNING - Verificación de contraseña fallida para servicio 'GitLab', usuario 'user{minuto}'.",
+                ], modo='a')
+                self.indice.refresh()
+            (indice_fichero,) = self.indice._indexes.values()
+            self.assertLessEqual(len(indice_fichero.segments), 2)
+        reabierto = AuditLogIndex(self.log_path)
+        self.assertEqual(reabierto.refresh(), 0)
+        self.assertEqual([e.user for e in reabierto.query(service="GitLab", refresh=False)], ["user1", "user0", "user1", "user2"])
+        reabierto.close()
+
+    def test_tramo_a_medio_escribir_se_descarta(self):
+        self.indice.refresh()
+        directorio = f"{self.log_path}.idx.d"
+        (nombre,) = os.listdir(directorio)
+        with open(os.path.join(directorio, nombre), 'ab') as f:
+            f.write(audit_log.MAGIC + b"\x10")
+        reabierto = AuditLogIndex(self.log_path)
+        self._escribir(self.log_path, [
+            "2025-05-15 12:00:00 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user1'.",
+        ], modo='a')
+        self.assertEqual(reabierto.refresh(), 1)
+        reabierto.close()
+        otro = AuditLogIndex(self.log_path)
+        self.assertEqual(otro.refresh(), 0)
+        self.assertEqual(len(otro.query(refresh=False)), len(LINEAS) + 1)
+        otro.close()
+
+    def test_linea_incompleta_se_indexa_al_completarse(self):
+        self.indice.refresh()
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write("2025-05-15 12:00:00 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user1'.")
+        self.assertEqual(self.indice.refresh(), 0)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        self.assertEqual(self.indice.query(event="credencial_eliminada")[0].service, "GitHub")
+
+    def test_ficheros_rotados(self):
+        self.indice.refresh()
+        os.rename(self.log_path, f"{self.log_path}.1")
+        self._escribir(self.log_path, [
+            "2025-05-15 13:00:00 - WARNING - Verificación de contraseña fallida para servicio 'GitHub', usuario 'user9'.",
+        ])
+        # Solo se indexa el log nuevo: el índice del rotado se reutiliza
+        self.assertEqual(self.indice.refresh(), 1)
+        eventos = self.indice.query(service="GitHub", event="verificacion_fallida")
+        self.assertEqual([evento.user for evento in eventos], ["user1", "user2", "user9"])
+        self.assertEqual(eventos[0].path, f"{self.log_path}.1")
+
+    def test_reloj_hacia_atras_conserva_la_marca_real(self):
+        self.indice.refresh()
+        self._escribir(self.log_path, [
+            "2025-05-15 12:00:00 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user1'.",
+            # El reloj retrocede una hora
+            "2025-05-15 11:00:30 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user2'.",
+            "2025-05-15 11:00:30 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user3'.",
+        ], modo='a')
+        eventos = self.indice.query(event="credencial_eliminada")
+        self.assertEqual([evento.user for evento in eventos], ["user2", "user3", "user1"])
+        self.assertEqual(eventos[0].timestamp, datetime(2025, 5, 15, 11, 0, 30))
+        self.assertEqual(self.indice.query(since=datetime(2025, 5, 15, 11, 0, 1), until=datetime(2025, 5, 15, 11, 59))[0].user, "user2")
+        # Un tramo posterior más antiguo que los anteriores se intercala en orden, también tras fundirlos
+        self._escribir(self.log_path, [
+            "2025-05-15 10:00:30 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user4'.",
+        ], modo='a')
+        self.assertEqual([evento.user for evento in self.indice.query(service="GitHub", since=datetime(2025, 5, 15, 10, 0, 1), until=datetime(2025, 5, 15, 10, 9))],
+                         ["user1", "user4", "user1"])
+        with mock.patch.object(audit_log, "MAX_SEGMENTS", 0):
+            self.indice.refresh()
+            self._escribir(self.log_path, ["2025-05-15 09:00:00 - INFO - Lista de servicios solicitada."], modo='a')
+            self.indice.refresh()
+        reabierto = AuditLogIndex(self.log_path)
+        eventos = reabierto.query(event="credencial_eliminada")
+        self.assertEqual([evento.user for evento in eventos], ["user4", "user2", "user3", "user1"])
+        self.assertEqual(reabierto.query(limit=1)[0].event, "servicios_listados")
+        reabierto.close()
+
+    def test_ficheros_rotados_solapados_en_el_tiempo(self):
+        os.rename(self.log_path, f"{self.log_path}.1")
+        self._escribir(self.log_path, [
+            "2025-05-15 10:07:00 - WARNING - Verificación de contraseña fallida para servicio 'GitHub', usuario 'user9'.",
+        ])
+        eventos = self.indice.query(service="GitHub", event="verificacion_fallida")
+        self.assertEqual([evento.user for evento in eventos], ["user9", "user1", "user2"])
+        self.assertEqual(eventos[0].path, self.log_path)
+
+    def test_log_en_latin1(self):
+        log_latin1 = os.path.join(self.tmp_dir, "latin1.log")
+        self._escribir(log_latin1, LINEAS, encoding='latin-1')
+        indice = AuditLogIndex(log_latin1)
+        self.assertEqual(len(indice.query(event="verificacion_fallida")), 3)
+        indice.close()
+
+    def test_cli_auditoria(self):
+        salida = io.StringIO()
+        with redirect_stdout(salida):
+            codigo = main(["auditoria", "--log", self.log_path, "--servicio", "GitHub",
+                           "--evento", "verificacion_fallida", "--desde", "2025-05-15 10:00", "--hasta", "2025-05-15 10:59"])
+        self.assertEqual(codigo, 0)
+        self.assertEqual(salida.getvalue().count("\n"), 1)
+        self.assertIn("usuario 'user1'", salida.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# tests/test_breached_passwords.py
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from src.gestor_credenciales import GestorCredenciales, InMemoryStorageStrategy, ErrorPoliticaPassword
+from src.gestor_credenciales.breached_passwords import BreachedPasswordIndex, build_index
+from src.gestor_credenciales.cli import main
+
+
+def _sha1(password):
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
+
+class TestBreachedPasswordIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.tmp_dir, "filtradas.txt")
+        self.index_path = os.path.join(self.tmp_dir, "filtradas.idx")
+        self.filtradas = ["PasswordFiltrada123!", "ClaveFiltrada456!", "123456", "qwerty"]
+        self.filtradas += [f"relleno{i}" for i in range(500)]
+        with open(self.source_path, 'w') as f:
+            for i, password in enumerate(self.filtradas):
+                # Mezcla formato 'HASH:apariciones', minúsculas y duplicados
+                f.write(f"{_sha1(password)}:{i + 1}\n" if i % 2 else f"{_sha1(password).lower()}\n")
+            f.write(f"{_sha1('qwerty')}:99\n")
+            f.write("esto no es un hash\n\n")
+        self.assertEqual(build_index(self.source_path, self.index_path, chunk_size=50), len(self.filtradas))
+        self.indice = BreachedPasswordIndex(self.index_path)
+
+    def tearDown(self):
+        self.indice.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_encuentra_passwords_filtradas(self):
+        self.assertEqual(len(self.indice), len(self.filtradas))
+        for password in self.filtradas:
+            with self.subTest(password=password):
+                self.assertIn(password, self.indice)
+
+    def test_no_encuentra_passwords_no_filtradas(self):
+        for password in ["PasswordSegura123!", "otra", "relleno500", ""]:
+            with self.subTest(password=password):
+                self.assertNotIn(password, self.indice)
+
+    def test_contains_many_respeta_el_orden(self):
+        consultas = ["qwerty", "PasswordSegura123!", "relleno7", "nada"]
+        self.assertEqual(self.indice.contains_many(consultas), [True, False, True, False])
+
+    def test_indice_vacio(self):
+        vacio_path = os.path.join(self.tmp_dir, "vacio.txt")
+        open(vacio_path, 'w').close()
+        vacio_index_path = os.path.join(self.tmp_dir, "vacio.idx")
+        self.assertEqual(build_index(vacio_path, vacio_index_path), 0)
+        vacio = BreachedPasswordIndex(vacio_index_path)
+        self.assertNotIn("qwerty", vacio)
+        vacio.close()
+
+    def test_fichero_invalido(self):
+        with self.assertRaises(ValueError):
+            BreachedPasswordIndex(self.source_path)
+
+    def test_gestor_rechaza_passwords_filtradas(self):
+        with self.assertRaises(ErrorPoliticaPassword):
+            GestorCredenciales("ClaveFiltrada456!", InMemoryStorageStrategy(), self.indice)
+        clave_maestra = "claveMaestraSegura123!"
+        gestor = GestorCredenciales(clave_maestra, InMemoryStorageStrategy(), self.indice)
+        with self.assertRaises(ErrorPoliticaPassword):
+            gestor.añadir_credencial(clave_maestra, "ServicioA", "UserA", "PasswordFiltrada123!")
+        with self.assertRaises(ErrorPoliticaPassword):
+            gestor.restablecer("ClaveFiltrada456!")
+
+    def test_cli_indexar_filtraciones(self):
+        destino = os.path.join(self.tmp_dir, "cli.idx")
+        salida = io.StringIO()
+        with redirect_stdout(salida):
+            self.assertEqual(main(["indexar-filtraciones", self.source_path, destino]), 0)
+        self.assertIn(str(len(self.filtradas)), salida.getvalue())
+        indice = BreachedPasswordIndex(destino)
+        self.assertIn("qwerty", indice)
+        indice.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@
 import unittest
 import logging
 import bcrypt
+from unittest import mock
 from src.gestor_credenciales import (
     GestorCredenciales, 
     ErrorPoliticaPassword, 
@@ -47,6 +48,56 @@ class TestSeguridadGestorCredenciales(unittest.TestCase):
                 self.gestor_valido.restablecer(self.password_muy_debil)
         self.assertIn("Error al restablecer: La nueva clave maestra proporcionada es débil.", log.output[0])
 
+    def test_restablecer_cambia_clave_y_vacia_credenciales(self):
+        nueva_clave = "NuevaClaveMaestra456!"
+        self.gestor_valido.añadir_credencial(self.clave_maestra_valida, "ServicioA", "UserA", self.password_robusta)
+        self.gestor_valido.restablecer(nueva_clave)
+
+        with self.assertRaises(ErrorAutenticacion):
+            self.gestor_valido.listar_servicios(self.clave_maestra_valida)
+        self.assertEqual(self.gestor_valido.listar_servicios(nueva_clave), [])
+        self.gestor_valido.añadir_credencial(nueva_clave, "ServicioA", "UserA", self.password_robusta)
+        self.assertTrue(self.gestor_valido.esperar_reclamacion(timeout=5))
+        self.assertTrue(self.gestor_valido.verificar_password(nueva_clave, "ServicioA", "UserA", self.password_robusta))
+
+    def test_restablecer_durante_operacion_en_curso_falla_rapido(self):
+        """Una operación autenticada con la clave antigua no debe tocar la nueva época."""
+        nueva_clave = "NuevaClaveMaestra456!"
+        self.gestor_valido.añadir_credencial(self.clave_maestra_valida, "ServicioA", "UserA", self.password_robusta)
+        get_credential_original = self.storage.get_credential
+
+        def get_credential_con_restablecimiento(servicio, usuario):
+            resultado = get_credential_original(servicio, usuario)
+            self.gestor_valido.restablecer(nueva_clave)
+            return resultado
+
+        self.storage.get_credential = get_credential_con_restablecimiento
+        with self.assertRaises(ErrorAutenticacion):
+            self.gestor_valido.verificar_password(self.clave_maestra_valida, "ServicioA", "UserA", self.password_robusta)
+
+    def test_restablecer_antes_de_las_postcondiciones_no_las_viola(self):
+        """Un restablecimiento entre la operación y su postcondición no debe convertirse en ViolationError."""
+        nueva_clave = "NuevaClaveMaestra456!"
+        info_original = logging.info
+        restablecido = []
+
+        def info_con_restablecimiento(mensaje, *args, **kwargs):
+            info_original(mensaje, *args, **kwargs)
+            # El log de éxito se emite ya fuera del lock de época, justo antes de las postcondiciones
+            if mensaje.startswith("Credencial") and not restablecido:
+                restablecido.append(True)
+                self.gestor_valido.restablecer(nueva_clave)
+
+        with mock.patch("src.gestor_credenciales.gestor_credenciales.logging.info", side_effect=info_con_restablecimiento):
+            self.gestor_valido.añadir_credencial(self.clave_maestra_valida, "ServicioA", "UserA", self.password_robusta)
+        self.assertFalse(self.gestor_valido._storage.credential_exists("ServicioA", "UserA"))
+
+        self.gestor_valido.añadir_credencial(nueva_clave, "ServicioA", "UserA", self.password_robusta)
+        restablecido.clear()
+        with mock.patch("src.gestor_credenciales.gestor_credenciales.logging.info", side_effect=info_con_restablecimiento):
+            self.gestor_valido.eliminar_credencial(nueva_clave, "ServicioA", "UserA")
+        self.assertTrue(self.gestor_valido.esperar_reclamacion(timeout=5))
+
     def test_añadir_credencial_duplicada_logs_warning_y_re_raises(self):
         """
         Cubre el bloque except ErrorCredencialExistente en añadir_credencial:
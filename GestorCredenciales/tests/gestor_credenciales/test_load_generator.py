@@ -0,0 +1,124 @@
+# tests/test_load_generator.py
+
+import io
+import logging
+import unittest
+from collections import Counter
+from contextlib import redirect_stdout
+from unittest import mock
+from src.gestor_credenciales.cli import main
+from src.gestor_credenciales.load_generator import (
+    LoadReport,
+    generate_workload,
+    parse_audit_trace,
+    run_workload,
+    saturation_curve
+)
+from src.gestor_credenciales.shared_file_storage import SharedFileStorageStrategy
+from src.gestor_credenciales.storage import InMemoryStorageStrategy
+
+
+class _Recolector(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def test_generate_workload_respeta_mezcla_y_semilla(self):
+        carga = generate_workload(2000, {"add": 1, "verify": 3}, n_keys=50, seed=7)
+        self.assertEqual(len(carga), 2000)
+        self.assertEqual(carga, generate_workload(2000, {"add": 1, "verify": 3}, n_keys=50, seed=7))
+        operaciones = Counter(operacion for operacion, _, _ in carga)
+        self.assertEqual(set(operaciones), {"add", "verify"})
+        self.assertGreater(operaciones["verify"], 2 * operaciones["add"])
+
+    def test_generate_workload_zipf_concentra_las_claves(self):
+        carga = generate_workload(5000, n_keys=1000, distribution="zipf", seed=1)
+        usuarios = Counter(usuario for _, _, usuario in carga)
+        self.assertEqual(usuarios.most_common(1)[0][0], "usuario0")
+        self.assertGreater(usuarios["usuario0"], 5000 / 1000 * 20)
+
+    def test_generate_workload_parametros_invalidos(self):
+        with self.assertRaises(ValueError):
+            generate_workload(10, {"borrar_todo": 1})
+        with self.assertRaises(ValueError):
+            generate_workload(10, distribution="normal")
+
+    def test_parse_audit_trace(self):
+        lineas = [
+            "2025-05-15 21:41:49 - INFO - Gestor de credenciales inicializado correctamente con InMemoryStorageStrategy.",
+            "2025-05-15 21:41:50 - INFO - Credencial añadida para servicio 'GitHub', usuario 'user1'.",
+            "2025-05-15 21:41:51 - INFO - Verificación de contraseña exitosa para servicio 'GitHub', usuario 'user1'.",
+            "2025-05-15 21:41:52 - WARNING - Verificación de contraseña fallida para servicio 'GitHub', usuario 'user1'.",
+            "2025-05-15 21:41:53 - INFO - Lista de servicios solicitada. 1 servicio(s) encontrado(s).",
+            "2025-05-15 21:41:54 - INFO - Credencial eliminada para servicio 'GitHub', usuario 'user1'.",
+            "2025-05-15 21:41:55 - INFO - InMemoryStorage: Credential added for GitHub - user1",
+        ]
+        self.assertEqual(parse_audit_trace(lineas), [
+            ("add", "GitHub", "user1"),
+            ("verify", "GitHub", "user1"),
+            ("verify", "GitHub", "user1"),
+            ("list", "", ""),
+            ("remove", "GitHub", "user1"),
+        ])
+
+    def test_run_workload_mide_latencias_y_errores(self):
+        carga = [
+            ("verify", "servicio1", "usuario1"),
+            ("add", "servicio1", "usuario1"),
+            ("list", "", ""),
+        ]
+        informe = run_workload(InMemoryStorageStrategy, carga, concurrency=2)
+        self.assertEqual(informe.operations, 3)
+        self.assertGreater(informe.throughput, 0)
+        self.assertEqual(informe.errors, {"ErrorCredencialExistente": 1})
+        self.assertEqual(sorted(informe.latencies), ["add", "list", "verify"])
+        percentiles = informe.percentiles()
+        self.assertLessEqual(percentiles["p50"], percentiles["max"])
+        self.assertIn("InMemoryStorageStrategy", informe.summary())
+
+    def test_run_workload_no_escribe_en_el_log_de_auditoria(self):
+        recolector = _Recolector()
+        raiz = logging.getLogger()
+        nivel = raiz.level
+        raiz.addHandler(recolector)
+        raiz.setLevel(logging.DEBUG)
+        try:
+            run_workload(InMemoryStorageStrategy, [("add", "servicio1", "usuario1")])
+            self.assertFalse(any("Credencial añadida" in mensaje for mensaje in recolector.mensajes))
+            self.assertTrue(any("Carga completada" in mensaje for mensaje in recolector.mensajes))
+            run_workload(InMemoryStorageStrategy, [("add", "servicio1", "usuario1")], audit_logging=True)
+            self.assertTrue(any("Credencial añadida" in mensaje for mensaje in recolector.mensajes))
+        finally:
+            raiz.removeHandler(recolector)
+            raiz.setLevel(nivel)
+        self.assertEqual(logging.root.manager.disable, logging.NOTSET)
+
+    def test_saturation_curve_un_informe_por_nivel(self):
+        informes = saturation_curve(InMemoryStorageStrategy, [("list", "", "")], concurrency_levels=(1, 2))
+        self.assertEqual([informe.concurrency for informe in informes], [1, 2])
+
+    def test_percentiles_sin_datos(self):
+        informe = LoadReport("Vacio", 1, 0, 0.0)
+        self.assertEqual(informe.throughput, 0.0)
+        self.assertEqual(informe.percentiles()["p99"], 0.0)
+
+    def test_cli_carga(self):
+        salida = io.StringIO()
+        cerrar = SharedFileStorageStrategy.close
+        with redirect_stdout(salida), \
+                mock.patch.object(SharedFileStorageStrategy, "close", autospec=True, side_effect=cerrar) as cierres:
+            codigo = main(["carga", "--operaciones", "2", "--mezcla", "list=1", "--concurrencia", "1,2",
+                           "--almacen", "memoria", "fichero", "escalonado"])
+        self.assertEqual(codigo, 0)
+        self.assertEqual(cierres.call_count, 4)
+        self.assertIn("InMemoryStorageStrategy", salida.getvalue())
+        self.assertIn("SharedFileStorageStrategy", salida.getvalue())
+        self.assertIn("TieredStorageStrategy", salida.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+# tests/test_pool_gestores.py
+
+import unittest
+from unittest import mock
+from icontract import ViolationError
+from src.gestor_credenciales import (
+    PoolGestores,
+    InMemoryStorageStrategy,
+    ErrorAutenticacion,
+    ErrorCredencialExistente,
+    ErrorPoliticaPassword
+)
+from src.gestor_credenciales.pool_gestores import PREFIJO_INDICE, _TenantStorageView, _servicio_metadatos
+
+
+class TestPoolGestores(unittest.TestCase):
+    def setUp(self):
+        self.storage = InMemoryStorageStrategy()
+        self.pool = PoolGestores(self.storage, capacidad=2)
+        self.clave_a = "ClaveMaestraTenantA1!"
+        self.clave_b = "ClaveMaestraTenantB2!"
+        self.password = "PasswordSegura123!"
+        self.pool.registrar_tenant("equipo_a", self.clave_a)
+        self.pool.registrar_tenant("equipo_b", self.clave_b)
+
+    def test_tenants_aislados_en_el_almacen_compartido(self):
+        self.pool.añadir_credencial("equipo_a", self.clave_a, "GitHub", "user1", self.password)
+        self.assertEqual(self.pool.listar_servicios("equipo_a", self.clave_a), ["GitHub"])
+        self.assertEqual(self.pool.listar_servicios("equipo_b", self.clave_b), [])
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.listar_servicios("equipo_b", self.clave_a)
+        self.pool.añadir_credencial("equipo_b", self.clave_b, "GitHub", "user1", "OtraPassword456!")
+        self.assertTrue(self.pool.verificar_password("equipo_a", self.clave_a, "GitHub", "user1", self.password))
+        self.assertFalse(self.pool.verificar_password("equipo_b", self.clave_b, "GitHub", "user1", self.password))
+        self.pool.eliminar_credencial("equipo_a", self.clave_a, "GitHub", "user1")
+        self.assertEqual(self.pool.listar_servicios("equipo_b", self.clave_b), ["GitHub"])
+
+    def test_autenticacion_repetida_no_pasa_por_bcrypt(self):
+        self.pool.listar_servicios("equipo_a", self.clave_a)
+        antes = self.pool.estadisticas()
+        self.pool.listar_servicios("equipo_a", self.clave_a)
+        self.pool.listar_servicios("equipo_a", self.clave_a)
+        despues = self.pool.estadisticas()
+        self.assertEqual(despues["autenticaciones_en_cache"] - antes["autenticaciones_en_cache"], 2)
+        self.assertEqual(despues["autenticaciones_bcrypt"], antes["autenticaciones_bcrypt"])
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.listar_servicios("equipo_a", "ClaveIncorrecta123!")
+        self.assertEqual(self.pool.listar_servicios("equipo_a", self.clave_a), [])
+
+    def test_cache_lru_acotada_y_carga_perezosa(self):
+        self.pool.registrar_tenant("equipo_c", "ClaveMaestraTenantC3!")
+        self.assertEqual(self.pool.estadisticas()["tenants_en_cache"], 2)
+        # equipo_a fue expulsado: se recarga desde el almacén al volver a usarlo
+        self.assertEqual(self.pool.listar_servicios("equipo_a", self.clave_a), [])
+        self.assertEqual(self.pool.estadisticas()["tenants_cargados"], 1)
+
+        nuevo_pool = PoolGestores(self.storage)
+        self.assertEqual(nuevo_pool.estadisticas()["tenants_en_cache"], 0)
+        self.assertEqual(nuevo_pool.listar_servicios("equipo_b", self.clave_b), [])
+        self.assertEqual(nuevo_pool.estadisticas()["tenants_cargados"], 1)
+
+    def test_intentos_fallidos_no_ocupan_la_cache(self):
+        self.pool.registrar_tenant("equipo_c", "ClaveMaestraTenantC3!")
+        self.pool.listar_servicios("equipo_a", self.clave_a)
+        for tenant in ("equipo_b", "equipo_c"):
+            with self.assertRaises(ErrorAutenticacion):
+                self.pool.listar_servicios(tenant, "ClaveIncorrecta123!")
+        self.assertIn("equipo_a", self.pool._gestores)
+        antes = self.pool.estadisticas()["autenticaciones_bcrypt"]
+        self.pool.listar_servicios("equipo_a", self.clave_a)
+        self.assertEqual(self.pool.estadisticas()["autenticaciones_bcrypt"], antes)
+
+    def test_restablecer_tenant(self):
+        nueva_clave = "NuevaClaveTenantA9!"
+        self.pool.añadir_credencial("equipo_a", self.clave_a, "GitHub", "user1", self.password)
+        self.pool.añadir_credencial("equipo_b", self.clave_b, "GitHub", "user1", self.password)
+        self.pool.restablecer("equipo_a", self.clave_a, nueva_clave)
+
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.listar_servicios("equipo_a", self.clave_a)
+        self.assertEqual(self.pool.listar_servicios("equipo_a", nueva_clave), [])
+        self.assertEqual(self.pool.listar_servicios("equipo_b", self.clave_b), ["GitHub"])
+        self.assertTrue(self.pool.esperar_reclamacion(timeout=5))
+        self.assertFalse(any(servicio.startswith("equipo_a::0::") for servicio in self.storage.list_services()))
+
+        # La nueva clave y la nueva generación quedan persistidas en el almacén
+        nuevo_pool = PoolGestores(self.storage)
+        self.assertEqual(nuevo_pool.listar_servicios("equipo_a", nueva_clave), [])
+
+    def test_restablecer_exige_la_clave_maestra_vigente(self):
+        self.pool.añadir_credencial("equipo_a", self.clave_a, "GitHub", "user1", self.password)
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.restablecer("equipo_a", self.clave_b, "NuevaClaveTenantA9!")
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.restablecer("equipo_inexistente", self.clave_a, "NuevaClaveTenantA9!")
+        self.assertEqual(self.pool.listar_servicios("equipo_a", self.clave_a), ["GitHub"])
+        self.pool.restablecer("equipo_a", self.clave_a, "NuevaClaveTenantA9!")
+        # La clave anterior ya no sirve para volver a restablecerlo
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.restablecer("equipo_a", self.clave_a, "OtraClaveTenantA8!")
+
+    def test_restablecer_con_una_clave_que_otro_restablecimiento_ha_sustituido(self):
+        gestor = self.pool._gestor("equipo_a")
+        epoca = gestor._autenticar(self.clave_a)
+        self.pool.restablecer("equipo_a", self.clave_a, "NuevaClaveTenantA9!")
+        with self.assertRaises(ErrorAutenticacion):
+            gestor.restablecer("OtraClaveTenantA8!", epoca)
+        self.assertEqual(self.pool.listar_servicios("equipo_a", "NuevaClaveTenantA9!"), [])
+
+    def test_restablecer_publica_la_nueva_clave_antes_de_invalidar(self):
+        nueva_clave = "NuevaClaveTenantA9!"
+        self.pool.añadir_credencial("equipo_a", self.clave_a, "GitHub", "user1", self.password)
+        # Caída justo después de guardar la nueva clave y antes de soltar las credenciales
+        with mock.patch.object(_TenantStorageView, "detach_all_credentials", side_effect=OSError("caída simulada")):
+            with self.assertRaises(OSError):
+                self.pool.restablecer("equipo_a", self.clave_a, nueva_clave)
+        nuevo_pool = PoolGestores(self.storage)
+        with self.assertRaises(ErrorAutenticacion):
+            nuevo_pool.listar_servicios("equipo_a", self.clave_a)
+        self.assertEqual(nuevo_pool.listar_servicios("equipo_a", nueva_clave), [])
+
+    def test_metadatos_tras_restablecer(self):
+        self.pool.restablecer("equipo_a", self.clave_a, "NuevaClaveTenantA9!")
+        self.assertCountEqual(self.storage.list_users(_servicio_metadatos("equipo_a")), ["alta", "1"])
+        self.assertCountEqual(self.storage.list_users(_servicio_metadatos("equipo_b")), ["alta", "0"])
+        # El nombre sigue reservado aunque ya no exista la generación 0
+        with self.assertRaises(ErrorCredencialExistente):
+            self.pool.registrar_tenant("equipo_a", self.clave_a)
+
+    def test_accesos_a_un_tenant_no_recorren_los_demas(self):
+        for i in range(20):
+            tenant = f"equipo_{i}"
+            self.storage.add_credential(_servicio_metadatos(tenant), "alta", b"")
+            self.storage.add_credential(f"{tenant}::0::GitHub", "user1", b"hash")
+        self.pool.añadir_credencial("equipo_a", self.clave_a, "GitHub", "user1", self.password)
+        self.pool.añadir_credencial("equipo_a", self.clave_a, "GitLab", "user1", self.password)
+        nuevo_pool = PoolGestores(self.storage)
+        with mock.patch.object(self.storage, "list_services", side_effect=AssertionError("recorre todo el almacén")):
+            self.assertCountEqual(nuevo_pool.listar_servicios("equipo_a", self.clave_a), ["GitHub", "GitLab"])
+            nuevo_pool.eliminar_credencial("equipo_a", self.clave_a, "GitLab", "user1")
+            self.assertEqual(nuevo_pool.listar_servicios("equipo_a", self.clave_a), ["GitHub"])
+            nuevo_pool.restablecer("equipo_a", self.clave_a, "NuevaClaveTenantA9!")
+            self.assertTrue(nuevo_pool.esperar_reclamacion(timeout=5))
+        self.assertFalse(any(servicio.startswith(("equipo_a::0::", f"{PREFIJO_INDICE}equipo_a::0")) for servicio in self.storage.list_services()))
+        self.assertIn("equipo_7::0::GitHub", self.storage.list_services())
+
+    def test_indice_no_pierde_servicios_con_altas_y_bajas_intercaladas(self):
+        vista = _TenantStorageView(self.storage, "equipo_c", 0)
+        vista.add_credential("GitHub", "user1", b"hash")
+        original = self.storage.remove_credential
+
+        def baja_con_alta_concurrente(service, user):
+            eliminada = original(service, user)
+            if service == f"{PREFIJO_INDICE}equipo_c::0":
+                # Otro proceso añade una credencial justo después de que se desapunte el servicio
+                self.storage.add_credential("equipo_c::0::GitHub", "user2", b"hash")
+            return eliminada
+
+        with mock.patch.object(self.storage, "remove_credential", side_effect=baja_con_alta_concurrente):
+            vista.remove_credential("GitHub", "user1")
+        self.assertEqual(vista.list_services(), ["GitHub"])
+
+    def test_restablecimientos_concurrentes_en_dos_pools(self):
+        otro_pool = PoolGestores(self.storage)
+        otro_pool.listar_servicios("equipo_a", self.clave_a)
+        gestor_obsoleto = otro_pool._gestores["equipo_a"]
+        self.pool.restablecer("equipo_a", self.clave_a, "NuevaClaveTenantA9!")
+        # Un restablecimiento que ya estaba en curso con la generación anterior pierde la carrera
+        with self.assertRaises(ErrorAutenticacion):
+            gestor_obsoleto.restablecer("OtraClaveTenantA8!")
+        self.assertEqual(PoolGestores(self.storage).listar_servicios("equipo_a", "NuevaClaveTenantA9!"), [])
+
+    def test_restablecer_en_otro_pool_invalida_la_cache(self):
+        otro_pool = PoolGestores(self.storage)
+        otro_pool.listar_servicios("equipo_a", self.clave_a)
+        nueva_clave = "NuevaClaveTenantA9!"
+        self.pool.restablecer("equipo_a", self.clave_a, nueva_clave)
+        with self.assertRaises(ErrorAutenticacion):
+            otro_pool.añadir_credencial("equipo_a", self.clave_a, "GitHub", "user1", self.password)
+        otro_pool.añadir_credencial("equipo_a", nueva_clave, "GitHub", "user1", self.password)
+        self.assertEqual(self.pool.listar_servicios("equipo_a", nueva_clave), ["GitHub"])
+        self.assertIn("equipo_a::1::GitHub", self.storage.list_services())
+
+    def test_errores_de_registro_y_acceso(self):
+        with self.assertRaises(ErrorAutenticacion):
+            self.pool.listar_servicios("equipo_inexistente", self.clave_a)
+        with self.assertRaises(ErrorCredencialExistente):
+            self.pool.registrar_tenant("equipo_a", self.clave_a)
+        with self.assertRaises(ErrorPoliticaPassword):
+            self.pool.registrar_tenant("equipo_d", "debil")
+        with self.assertRaises(ViolationError):
+            self.pool.registrar_tenant("equipo::d", self.clave_a)
+
+    def test_capacidad_invalida(self):
+        with self.assertRaises(ValueError):
+            PoolGestores(self.storage, capacidad=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+# tests/test_replication.py
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from src.gestor_credenciales.replication import (
+    ChangeLog,
+    PublishingStorageStrategy,
+    ReplicaStorageStrategy
+)
+from src.gestor_credenciales.storage import InMemoryStorageStrategy
+from src.gestor_credenciales.exceptions import (
+    ErrorCredencialExistente,
+    ErrorReplicaDesincronizada,
+    ErrorReplicaSoloLectura
+)
+
+
+def _replica_en_otro_proceso(log_path, snapshot_path, sequence, queue):
+    replica = ReplicaStorageStrategy(log_path, snapshot_path)
+    alcanzada = replica.wait_for_sequence(sequence, timeout=10.0)
+    queue.put((alcanzada, replica.get_credential("service1", "user1"), sorted(replica.list_services())))
+
+
+class TestReplication(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tmp_dir, "cambios.jsonl")
+        self.snapshot_path = os.path.join(self.tmp_dir, "snapshot.json")
+        self.change_log = ChangeLog(self.log_path)
+        self.primario = PublishingStorageStrategy(InMemoryStorageStrategy(), self.change_log)
+
+    def tearDown(self):
+        self.change_log.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_mutaciones_publicadas_con_secuencia(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.add_credential("service2", "user2", b"hash2")
+        self.primario.remove_credential("service2", "user2")
+        self.primario.clear_all_credentials()
+        self.assertEqual(self.primario.last_sequence, 4)
+        self.assertEqual(self.change_log.last_sequence(), 4)
+
+    def test_ultima_secuencia_de_un_flujo_largo(self):
+        self.assertEqual(self.change_log.last_sequence(), 0)
+        # Líneas más largas que un bloque de lectura hacia atrás
+        for i in range(5):
+            self.primario.add_credential("service1", f"user{i}", os.urandom(4000))
+        self.assertEqual(self.change_log.last_sequence(), 5)
+        with mock.patch("src.gestor_credenciales.replication.read_changes") as lectura_completa:
+            self.assertEqual(ChangeLog(self.log_path).last_sequence(), 5)
+        lectura_completa.assert_not_called()
+
+    def test_mutaciones_fallidas_no_se_publican(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        with self.assertRaises(ErrorCredencialExistente):
+            self.primario.add_credential("service1", "user1", b"otro")
+        self.assertFalse(self.primario.remove_credential("service1", "no_existe"))
+        self.assertEqual(self.primario.last_sequence, 1)
+
+    def test_fallo_al_publicar_no_deja_huecos_ni_cambios_sin_publicar(self):
+        change_log = ChangeLog(os.path.join(self.tmp_dir, "con_fsync.jsonl"), fsync=True)
+        self.addCleanup(change_log.close)
+        primario = PublishingStorageStrategy(InMemoryStorageStrategy(), change_log)
+        primario.add_credential("service1", "user1", b"hash1")
+        replica = ReplicaStorageStrategy(change_log.path)
+        with mock.patch("src.gestor_credenciales.replication.os.fsync", side_effect=OSError("disco lleno")):
+            with self.assertRaises(OSError):
+                primario.add_credential("service1", "user2", b"hash2")
+            with self.assertRaises(OSError):
+                primario.remove_credential("service1", "user1")
+        # El almacén queda como estaba y la secuencia no avanza
+        self.assertFalse(primario.credential_exists("service1", "user2"))
+        self.assertEqual(primario.get_credential("service1", "user1"), b"hash1")
+        self.assertEqual(primario.last_sequence, 1)
+        primario.add_credential("service1", "user3", b"hash3")
+        self.assertEqual(replica.get_credential("service1", "user3"), b"hash3")
+        self.assertFalse(replica.credential_exists("service1", "user2"))
+        self.assertEqual(replica.last_sequence, 2)
+
+    def test_reabrir_el_flujo_corta_la_linea_a_medias(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.change_log.close()
+        # El primario murió a mitad de escribir el segundo cambio
+        with open(self.log_path, 'ab') as f:
+            f.write(b'{"seq":2,"op":"add","serv')
+        self.change_log = ChangeLog(self.log_path)
+        primario = PublishingStorageStrategy(InMemoryStorageStrategy(), self.change_log)
+        self.assertEqual(primario.last_sequence, 1)
+        primario.add_credential("service1", "user2", b"hash2")
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.assertEqual(replica.last_sequence, 2)
+        self.assertEqual(replica.get_credential("service1", "user2"), b"hash2")
+
+    def test_replica_aplica_cambios_incrementalmente(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(replica.get_credential("service1", "user1"), b"hash1")
+        self.primario.remove_credential("service1", "user1")
+        self.assertFalse(replica.credential_exists("service1", "user1"))
+        self.assertEqual(replica.list_services(), [])
+        self.assertEqual(replica.last_sequence, 2)
+
+    def test_replica_sin_auto_sync_lee_tras_esperar_secuencia(self):
+        replica = ReplicaStorageStrategy(self.log_path, auto_sync=False)
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.assertIsNone(replica.get_credential("service1", "user1"))
+        self.assertTrue(replica.wait_for_sequence(self.primario.last_sequence))
+        self.assertEqual(replica.get_credential("service1", "user1"), b"hash1")
+
+    def test_wait_for_sequence_timeout(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.assertFalse(replica.wait_for_sequence(5, timeout=0.05))
+
+    def test_replica_arranca_desde_snapshot(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.add_credential("service1", "user2", b"hash2")
+        self.assertEqual(self.primario.write_snapshot(self.snapshot_path), 2)
+        self.primario.add_credential("service2", "user3", b"hash3")
+
+        replica = ReplicaStorageStrategy(self.log_path, self.snapshot_path)
+        self.assertEqual(replica.last_sequence, 3)
+        self.assertCountEqual(replica.list_users("service1"), ["user1", "user2"])
+        self.assertEqual(replica.get_credential("service2", "user3"), b"hash3")
+
+    def test_replica_clear_all(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.clear_all_credentials()
+        self.assertEqual(replica.list_services(), [])
+
+    def test_detach_all_credentials_se_publica_como_clear(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(list(self.primario.detach_all_credentials()), [1])
+        self.assertEqual(self.primario.last_sequence, 2)
+        self.assertEqual(replica.list_services(), [])
+
+    def test_replica_informa_de_los_cambios_recientes(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        contador = replica.change_counter()
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.remove_credential("service1", "user1")
+        self.assertEqual(replica.changes_since(contador), (2, [("service1", "user1"), ("service1", "user1")]))
+        self.primario.clear_all_credentials()
+        self.assertEqual(replica.changes_since(2), (3, None))
+        self.assertEqual(replica.changes_since(3), (3, []))
+
+    def test_replica_es_solo_lectura(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        with self.assertRaises(ErrorReplicaSoloLectura):
+            replica.add_credential("service1", "user1", b"hash1")
+        with self.assertRaises(ErrorReplicaSoloLectura):
+            replica.remove_credential("service1", "user1")
+        with self.assertRaises(ErrorReplicaSoloLectura):
+            replica.clear_all_credentials()
+
+    def test_replica_detecta_huecos_en_el_flujo(self):
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(replica.sync(), 1)
+        with open(self.log_path, 'ab') as f:
+            f.write(b'{"seq":3,"op":"clear"}\n')
+        with self.assertRaises(ErrorReplicaDesincronizada):
+            replica.sync()
+
+    def test_replica_detecta_flujo_truncado(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.assertEqual(replica.last_sequence, 1)
+        os.truncate(self.log_path, 0)
+        with self.assertRaises(ErrorReplicaDesincronizada):
+            replica.get_credential("service1", "user1")
+
+    def test_replica_detecta_flujo_recreado(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        replica = ReplicaStorageStrategy(self.log_path)
+        self.change_log.close()
+        os.remove(self.log_path)
+        self.change_log = ChangeLog(self.log_path)
+        primario = PublishingStorageStrategy(InMemoryStorageStrategy(), self.change_log)
+        # El flujo nuevo vuelve a empezar en 1 y ya ha superado el desplazamiento de la réplica
+        for i in range(3):
+            primario.add_credential("service2", f"user{i}", b"hash")
+        with self.assertRaises(ErrorReplicaDesincronizada):
+            replica.sync()
+
+    def test_snapshot_de_otro_flujo_no_arranca(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.write_snapshot(self.snapshot_path)
+        os.truncate(self.log_path, 0)
+        with self.assertRaises(ErrorReplicaDesincronizada):
+            ReplicaStorageStrategy(self.log_path, self.snapshot_path)
+        # Un flujo recreado que ya ha superado el desplazamiento de la foto tampoco encaja
+        primario = PublishingStorageStrategy(InMemoryStorageStrategy(), self.change_log)
+        for i in range(3):
+            primario.add_credential("service1", f"user{i}", b"hash")
+        with self.assertRaises(ErrorReplicaDesincronizada):
+            ReplicaStorageStrategy(self.log_path, self.snapshot_path)
+
+    def test_snapshot_sin_ultima_linea_se_comprueba_por_secuencia(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.write_snapshot(self.snapshot_path)
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        del snapshot["tail"]
+        with open(self.snapshot_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        self.primario.add_credential("service2", "user2", b"hash2")
+        replica = ReplicaStorageStrategy(self.log_path, self.snapshot_path)
+        self.assertEqual(replica.last_sequence, 2)
+        self.assertEqual(replica.get_credential("service2", "user2"), b"hash2")
+
+    def test_primario_reabierto_continua_la_secuencia(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.change_log.close()
+        self.change_log = ChangeLog(self.log_path)
+        primario = PublishingStorageStrategy(InMemoryStorageStrategy(), self.change_log)
+        self.assertEqual(primario.last_sequence, 1)
+        primario.add_credential("service2", "user2", b"hash2")
+        self.assertEqual(primario.last_sequence, 2)
+
+    def test_replica_en_otro_proceso(self):
+        self.primario.add_credential("service1", "user1", b"hash1")
+        self.primario.write_snapshot(self.snapshot_path)
+        queue = multiprocessing.Queue()
+        proceso = multiprocessing.Process(
+            target=_replica_en_otro_proceso,
+            args=(self.log_path, self.snapshot_path, 3, queue)
+        )
+        proceso.start()
+        self.primario.add_credential("service2", "user2", b"hash2")
+        self.primario.add_credential("service3", "user3", b"hash3")
+        alcanzada, credencial, servicios = queue.get(timeout=15)
+        proceso.join(timeout=15)
+        self.assertTrue(alcanzada)
+        self.assertEqual(credencial, b"hash1")
+        self.assertEqual(servicios, ["service1", "service2", "service3"])
+
+if __name__ == "__main__":
+    unittest.main()
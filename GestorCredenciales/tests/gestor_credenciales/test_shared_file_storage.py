@@ -0,0 +1,241 @@
+# tests/test_shared_file_storage.py
+
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from src.gestor_credenciales import shared_file_storage
+from src.gestor_credenciales.shared_file_storage import SharedFileStorageStrategy
+from src.gestor_credenciales.exceptions import ErrorCredencialExistente
+
+
+def _escritor(path, worker, n):
+    storage = SharedFileStorageStrategy(path)
+    for i in range(n):
+        storage.add_credential(f"service{worker}", f"user{i}", f"hash{worker}_{i}".encode())
+    storage.close()
+
+
+class TestSharedFileStorageStrategy(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "vault.bin")
+        self.storage = SharedFileStorageStrategy(self.path)
+        self.otro = SharedFileStorageStrategy(self.path)
+
+    def tearDown(self):
+        self.storage.close()
+        self.otro.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_add_get_remove(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(self.storage.get_credential("service1", "user1"), b"hash1")
+        self.assertTrue(self.storage.credential_exists("service1", "user1"))
+        self.assertTrue(self.storage.remove_credential("service1", "user1"))
+        self.assertIsNone(self.storage.get_credential("service1", "user1"))
+        self.assertFalse(self.storage.remove_credential("service1", "user1"))
+        self.assertEqual(self.storage.list_services(), [])
+
+    def test_cambios_visibles_desde_otra_instancia(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.add_credential("service1", "user2", b"hash2")
+        self.assertEqual(self.otro.get_credential("service1", "user1"), b"hash1")
+        self.assertCountEqual(self.otro.list_users("service1"), ["user1", "user2"])
+        self.otro.remove_credential("service1", "user1")
+        self.assertFalse(self.storage.credential_exists("service1", "user1"))
+
+    def test_duplicado_detectado_entre_instancias(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        with self.assertRaises(ErrorCredencialExistente):
+            self.otro.add_credential("service1", "user1", b"otro")
+
+    def test_generacion_avanza_con_cada_escritura(self):
+        inicial = self.otro.generation
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.otro.list_services()
+        self.assertGreater(self.otro.generation, inicial)
+        actual = self.otro.generation
+        self.otro.list_services()
+        self.assertEqual(self.otro.generation, actual)
+
+    def test_clear_all_credentials(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.add_credential("service2", "user2", b"hash2")
+        self.otro.clear_all_credentials()
+        self.assertEqual(self.storage.list_services(), [])
+        self.storage.add_credential("service1", "user1", b"nuevo")
+        self.assertEqual(self.otro.get_credential("service1", "user1"), b"nuevo")
+
+    def test_compactacion_conserva_credenciales_vivas(self):
+        with mock.patch.object(shared_file_storage, "COMPACT_MIN_TAIL_BYTES", 0):
+            for i in range(20):
+                self.storage.add_credential("service1", f"user{i}", b"hash")
+            for i in range(15):
+                self.storage.remove_credential("service1", f"user{i}")
+        tamaño_datos = self.storage._offset - self.storage._start
+        self.assertLess(tamaño_datos, 20 * 30)
+        self.assertCountEqual(self.otro.list_users("service1"), [f"user{i}" for i in range(15, 20)])
+
+    def test_coincide_con_un_diccionario_con_y_sin_compactar(self):
+        aleatorio = random.Random(7)
+        esperado = {}
+        for limite in (shared_file_storage.COMPACT_MIN_TAIL_BYTES, 0, 512):
+            with mock.patch.object(shared_file_storage, "COMPACT_MIN_TAIL_BYTES", limite):
+                for _ in range(300):
+                    clave = (f"service{aleatorio.randrange(5)}", f"user{aleatorio.randrange(20)}")
+                    if clave in esperado:
+                        self.assertTrue(self.storage.remove_credential(*clave))
+                        del esperado[clave]
+                    else:
+                        valor = f"hash{aleatorio.random()}".encode()
+                        self.storage.add_credential(*clave, valor)
+                        esperado[clave] = valor
+                for clave in [(f"service{s}", f"user{u}") for s in range(5) for u in range(20)]:
+                    self.assertEqual(self.otro.get_credential(*clave), esperado.get(clave))
+                servicios = {servicio for servicio, _ in esperado}
+                self.assertCountEqual(self.otro.list_services(), servicios)
+                for servicio in servicios:
+                    self.assertCountEqual(self.otro.list_users(servicio), [u for s, u in esperado if s == servicio])
+
+    def test_servicio_dado_de_baja_en_la_cola_no_se_lista(self):
+        with mock.patch.object(shared_file_storage, "COMPACT_MIN_TAIL_BYTES", 0):
+            self.storage.add_credential("service1", "user1", b"hash1")
+        # La tabla tiene service1 y la cola su baja
+        self.storage.remove_credential("service1", "user1")
+        self.storage.add_credential("service2", "user2", b"hash2")
+        self.assertEqual(self.otro.list_services(), ["service2"])
+        self.assertEqual(self.otro.list_users("service1"), [])
+
+    def test_las_lecturas_se_sirven_desde_la_tabla(self):
+        with mock.patch.object(shared_file_storage, "COMPACT_MIN_TAIL_BYTES", 0):
+            for i in range(50):
+                self.storage.add_credential("service1", f"user{i}", f"hash{i}".encode())
+        self.assertEqual(self.otro.get_credential("service1", "user42"), b"hash42")
+        # Solo la cola pendiente de compactar (a lo sumo una fracción de la tabla) ocupa memoria en cada proceso
+        en_memoria = sum(len(users) for users in self.otro._overlay.values())
+        self.assertLessEqual(en_memoria, 50 // shared_file_storage.COMPACT_TAIL_FRACTION)
+        self.assertEqual(self.otro._count + en_memoria, 50)
+
+    def test_caida_durante_la_compactacion_conserva_los_datos(self):
+        for i in range(10):
+            self.storage.add_credential("service1", f"user{i}", f"hash{i}".encode())
+        for i in range(5):
+            self.storage.remove_credential("service1", f"user{i}")
+
+        escrituras = []
+
+        def escritura_a_medias(data, offset):
+            # La primera escritura es el registro de baja; la segunda, la copia compactada
+            escrituras.append(offset)
+            if len(escrituras) == 1:
+                os.pwrite(self.storage._fd, data, offset)
+                return
+            os.pwrite(self.storage._fd, data[:len(data) // 2], offset)
+            raise OSError("caída simulada")
+
+        with mock.patch.object(self.storage, "_write_data", side_effect=escritura_a_medias), \
+                mock.patch.object(shared_file_storage, "COMPACT_MIN_TAIL_BYTES", 0):
+            with self.assertRaises(OSError):
+                self.storage.remove_credential("service1", "user5")
+        esperado = {f"user{i}": f"hash{i}".encode() for i in range(6, 10)}
+        self.assertEqual({user: self.otro.get_credential("service1", user) for user in self.otro.list_users("service1")}, esperado)
+        reabierto = SharedFileStorageStrategy(self.path)
+        self.assertCountEqual(reabierto.list_users("service1"), list(esperado))
+        reabierto.close()
+
+    def test_lector_repara_cabecera_de_escritor_muerto(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        # Simula un escritor que murió con la generación impar a medio publicar
+        generacion = self.storage._read_u64(shared_file_storage._GENERATION_OFFSET)
+        self.storage._write_u64(shared_file_storage._GENERATION_OFFSET, generacion + 1)
+        self.assertEqual(self.otro.get_credential("service1", "user1"), b"hash1")
+        self.assertEqual(self.otro.generation % 2, 0)
+
+    def test_instancias_del_mismo_proceso_se_excluyen(self):
+        tercero = SharedFileStorageStrategy(self.path)
+        escritor = threading.Thread(target=self.otro.add_credential, args=("service1", "user1", b"hash1"))
+        with self.storage._write_lock():
+            escritor.start()
+            # Cerrar otra instancia sobre la misma ruta no debe soltar el cerrojo de esta
+            tercero.close()
+            escritor.join(timeout=0.2)
+            self.assertTrue(escritor.is_alive())
+        escritor.join(timeout=5)
+        self.assertFalse(escritor.is_alive())
+        self.assertEqual(self.storage.get_credential("service1", "user1"), b"hash1")
+
+    def test_cambios_desde_un_contador(self):
+        contador = self.otro.change_counter()
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.add_credential("service2", "user2", b"hash2")
+        self.storage.remove_credential("service1", "user1")
+        contador, cambios = self.otro.changes_since(contador)
+        self.assertEqual(cambios, [("service1", "user1"), ("service2", "user2"), ("service1", "user1")])
+        self.assertEqual(self.otro.changes_since(contador), (contador, []))
+        # Una compactación (aquí, un vaciado) no deja saber qué cambió
+        self.storage.clear_all_credentials()
+        self.assertIsNone(self.otro.changes_since(contador)[1])
+
+    def test_contador_de_cambios_concurrente_con_lecturas(self):
+        # change_counter no toma el cerrojo: no puede leer un mmap que otro hilo acaba de sustituir
+        errores = []
+        parar = threading.Event()
+
+        def en_bucle(operacion):
+            try:
+                while not parar.is_set():
+                    operacion()
+            except Exception as error:  # pragma: no cover - solo si hay carrera
+                errores.append(error)
+                parar.set()
+
+        hilos = [threading.Thread(target=en_bucle, args=(self.storage.change_counter,)) for _ in range(3)]
+        hilos.append(threading.Thread(target=en_bucle, args=(lambda: self.storage.get_credential("service1", "user0"),)))
+        for hilo in hilos:
+            hilo.start()
+        try:
+            for i in range(1500):
+                if parar.is_set():
+                    break
+                self.otro.add_credential("service1", f"user{i}", b"h" * 60)
+        finally:
+            parar.set()
+            for hilo in hilos:
+                hilo.join()
+        self.assertEqual(errores, [])
+
+    def test_formato_incompatible(self):
+        otro_path = os.path.join(self.tmp_dir, "otro.bin")
+        with open(otro_path, 'wb') as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            SharedFileStorageStrategy(otro_path)
+
+    def test_persistencia_al_reabrir(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.close()
+        self.storage = SharedFileStorageStrategy(self.path)
+        self.assertEqual(self.storage.get_credential("service1", "user1"), b"hash1")
+
+    def test_escritores_en_varios_procesos(self):
+        procesos = [
+            multiprocessing.Process(target=_escritor, args=(self.path, worker, 25))
+            for worker in range(4)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join(timeout=30)
+            self.assertEqual(proceso.exitcode, 0)
+        self.assertCountEqual(self.storage.list_services(), [f"service{w}" for w in range(4)])
+        for worker in range(4):
+            self.assertEqual(len(self.storage.list_users(f"service{worker}")), 25)
+        self.assertEqual(self.storage.get_credential("service3", "user24"), b"hash3_24")
+
+if __name__ == "__main__":
+    unittest.main()
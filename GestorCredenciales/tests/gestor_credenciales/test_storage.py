@@ -1,7 +1,7 @@
 # tests/test_storage.py
 
 import unittest
-from src.gestor_credenciales.storage import InMemoryStorageStrategy
+from src.gestor_credenciales.storage import InMemoryStorageStrategy, StorageStrategy
 from src.gestor_credenciales.exceptions import ErrorCredencialExistente
 
 class TestInMemoryStorageStrategy(unittest.TestCase):
@@ -47,6 +47,12 @@ class TestInMemoryStorageStrategy(unittest.TestCase):
         services = self.storage.list_services()
         self.assertCountEqual(services, [self.service1, self.service2])
 
+    def test_list_users(self):
+        self.assertEqual(self.storage.list_users(self.service1), [])
+        self.storage.add_credential(self.service1, self.user1, self.pass1_hash)
+        self.storage.add_credential(self.service1, "user1_another", b"another_hash_s1")
+        self.assertCountEqual(self.storage.list_users(self.service1), [self.user1, "user1_another"])
+
     def test_clear_all_credentials(self):
         self.storage.add_credential(self.service1, self.user1, self.pass1_hash)
         self.storage.add_credential(self.service2, self.user2, self.pass2_hash)
@@ -55,6 +61,15 @@ class TestInMemoryStorageStrategy(unittest.TestCase):
         self.assertIsNone(self.storage.get_credential(self.service1, self.user1))
         self.assertFalse(self.storage.credential_exists(self.service1, self.user1))
 
+    def test_detach_all_credentials(self):
+        self.storage.add_credential(self.service1, self.user1, self.pass1_hash)
+        self.storage.add_credential(self.service1, "user1_another", b"another_hash_s1")
+        self.storage.add_credential(self.service2, self.user2, self.pass2_hash)
+        reclaimer = self.storage.detach_all_credentials(batch_size=2)
+        self.assertEqual(self.storage.list_services(), [])
+        self.assertFalse(self.storage.credential_exists(self.service1, self.user1))
+        self.assertEqual(list(reclaimer), [2, 1])
+
     def test_credential_exists(self):
         self.assertFalse(self.storage.credential_exists(self.service1, self.user1))
         self.storage.add_credential(self.service1, self.user1, self.pass1_hash)
@@ -62,5 +77,17 @@ class TestInMemoryStorageStrategy(unittest.TestCase):
         self.assertFalse(self.storage.credential_exists(self.service1, "other_user"))
         self.assertFalse(self.storage.credential_exists("other_service", self.user1))
 
+class _EstrategiaSinListarUsuarios(StorageStrategy):
+    """Estrategia de terceros anterior a list_users."""
+    add_credential = get_credential = remove_credential = None
+    list_services = clear_all_credentials = credential_exists = None
+
+
+class TestStorageStrategy(unittest.TestCase):
+    def test_estrategia_sin_list_users_sigue_instanciandose(self):
+        storage = _EstrategiaSinListarUsuarios()
+        with self.assertRaises(NotImplementedError):
+            storage.list_users("service1")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,190 @@
+# tests/test_tiered_storage.py
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from src.gestor_credenciales.shared_file_storage import SharedFileStorageStrategy
+from src.gestor_credenciales.storage import InMemoryStorageStrategy
+from src.gestor_credenciales.tiered_storage import TieredStorageStrategy
+from src.gestor_credenciales.exceptions import ErrorCredencialExistente
+
+
+class _BackendLento(InMemoryStorageStrategy):
+    """Almacén cuyas bajas se quedan bloqueadas hasta que el test las libera."""
+
+    def __init__(self):
+        super().__init__()
+        self.en_baja = threading.Event()
+        self.liberar = threading.Event()
+
+    def remove_credential(self, service: str, user: str) -> bool:
+        self.en_baja.set()
+        self.liberar.wait(5)
+        return super().remove_credential(service, user)
+
+
+class TestTieredStorageStrategy(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryStorageStrategy()
+        self.storage = TieredStorageStrategy(self.backend, capacity=2)
+
+    def tearDown(self):
+        self.storage.stop_background_demotion()
+
+    def test_escrituras_llegan_al_nivel_persistente(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(self.backend.get_credential("service1", "user1"), b"hash1")
+        with self.assertRaises(ErrorCredencialExistente):
+            self.storage.add_credential("service1", "user1", b"otro")
+        self.assertEqual(self.storage.list_services(), ["service1"])
+        self.assertEqual(self.storage.list_users("service1"), ["user1"])
+
+    def test_aciertos_y_fallos(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(self.storage.get_credential("service1", "user1"), b"hash1")
+        self.assertEqual(self.storage.get_credential("service1", "user1"), b"hash1")
+        self.assertIsNone(self.storage.get_credential("service1", "no_existe"))
+        stats = self.storage.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertAlmostEqual(stats["hit_ratio"], 1 / 3)
+        self.assertEqual(stats["hot_size"], 1)
+
+    def test_capacidad_acotada_y_admision_por_frecuencia(self):
+        for user in ["caliente1", "caliente2"] + [f"frio{i}" for i in range(10)]:
+            self.storage.add_credential("service1", user, b"hash")
+        for _ in range(5):
+            self.storage.get_credential("service1", "caliente1")
+            self.storage.get_credential("service1", "caliente2")
+        for i in range(10):
+            self.storage.get_credential("service1", f"frio{i}")
+        self.assertEqual(self.storage.stats()["hot_size"], 2)
+        self.assertEqual(self.storage.stats()["rejections"], 10)
+        self.assertEqual(self.storage.get_credential("service1", "caliente1"), b"hash")
+        self.assertEqual(self.storage.stats()["hits"], 9)
+
+    def test_clave_que_se_calienta_desplaza_a_la_victima(self):
+        for user in ["a", "b", "c"]:
+            self.storage.add_credential("service1", user, b"hash")
+        self.storage.get_credential("service1", "a")
+        self.storage.get_credential("service1", "b")
+        for _ in range(3):
+            self.storage.get_credential("service1", "c")
+        self.assertEqual(self.storage.stats()["evictions"], 1)
+        self.assertIn(("service1", "c"), self.storage._hot)
+
+    def test_eliminar_invalida_el_nivel_en_memoria(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.get_credential("service1", "user1")
+        self.assertTrue(self.storage.remove_credential("service1", "user1"))
+        self.assertIsNone(self.storage.get_credential("service1", "user1"))
+        self.assertFalse(self.storage.credential_exists("service1", "user1"))
+        self.assertFalse(self.backend.credential_exists("service1", "user1"))
+
+    def test_aciertos_no_esperan_a_la_escritura_en_el_almacen(self):
+        backend = _BackendLento()
+        storage = TieredStorageStrategy(backend, capacity=2)
+        storage.add_credential("service1", "caliente", b"hash1")
+        storage.add_credential("service1", "frio", b"hash2")
+        storage.get_credential("service1", "caliente")
+        baja = threading.Thread(target=storage.remove_credential, args=("service1", "frio"))
+        baja.start()
+        self.assertTrue(backend.en_baja.wait(5))
+        lector = threading.Thread(target=storage.get_credential, args=("service1", "caliente"))
+        lector.start()
+        lector.join(timeout=1)
+        terminado_antes = not lector.is_alive()
+        backend.liberar.set()
+        baja.join()
+        lector.join()
+        self.assertTrue(terminado_antes)
+        self.assertFalse(storage.credential_exists("service1", "frio"))
+
+    def test_clear_y_detach_vacian_ambos_niveles(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.get_credential("service1", "user1")
+        self.storage.clear_all_credentials()
+        self.assertIsNone(self.storage.get_credential("service1", "user1"))
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.get_credential("service1", "user1")
+        list(self.storage.detach_all_credentials())
+        self.assertFalse(self.storage.credential_exists("service1", "user1"))
+        self.assertEqual(self.storage.stats()["hot_size"], 0)
+
+    def test_degradacion_de_entradas_frias(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.get_credential("service1", "user1")
+        self.assertEqual(self.storage.demote_cold(), 0)
+        self.storage._sketch.age()
+        self.assertEqual(self.storage.demote_cold(), 1)
+        self.assertEqual(self.storage.stats()["hot_size"], 0)
+        self.assertEqual(self.storage.get_credential("service1", "user1"), b"hash1")
+
+    def test_degradacion_en_segundo_plano(self):
+        self.storage.add_credential("service1", "user1", b"hash1")
+        self.storage.get_credential("service1", "user1")
+        self.storage.start_background_demotion(interval=0.01)
+        limite = time.monotonic() + 5
+        while self.storage.stats()["hot_size"] and time.monotonic() < limite:
+            time.sleep(0.01)
+        self.storage.stop_background_demotion()
+        self.assertEqual(self.storage.stats()["demotions"], 1)
+
+    def test_cambios_de_otro_proceso_invalidan_el_nivel_en_memoria(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "vault.bin")
+        backend_a = SharedFileStorageStrategy(path)
+        backend_b = SharedFileStorageStrategy(path)
+        self.addCleanup(backend_a.close)
+        self.addCleanup(backend_b.close)
+        trabajador_a = TieredStorageStrategy(backend_a, capacity=2)
+        trabajador_b = TieredStorageStrategy(backend_b, capacity=2)
+
+        trabajador_a.add_credential("service1", "user1", b"hash1")
+        self.assertEqual(trabajador_a.get_credential("service1", "user1"), b"hash1")
+        self.assertEqual(trabajador_a.stats()["hot_size"], 1)
+        self.assertTrue(trabajador_b.remove_credential("service1", "user1"))
+        self.assertIsNone(trabajador_a.get_credential("service1", "user1"))
+        self.assertFalse(trabajador_a.credential_exists("service1", "user1"))
+        self.assertEqual(trabajador_a.stats()["invalidations"], 1)
+
+    def test_escrituras_mezcladas_con_aciertos_no_vacian_el_nivel_en_memoria(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "vault.bin")
+        backend = SharedFileStorageStrategy(path)
+        otro_proceso = SharedFileStorageStrategy(path)
+        self.addCleanup(backend.close)
+        self.addCleanup(otro_proceso.close)
+        storage = TieredStorageStrategy(backend, capacity=32)
+        for i in range(20):
+            otro_proceso.add_credential("service1", f"caliente{i}", b"hash")
+
+        for i in range(2000):
+            if i % 10 == 0:
+                # Un 10 % de escrituras en claves frías, propias y de otro proceso a partes iguales
+                escritor = storage if i % 20 else otro_proceso
+                escritor.add_credential("service2", f"frio{i}", b"hash")
+            else:
+                self.assertEqual(storage.get_credential("service1", f"caliente{i % 20}"), b"hash")
+        stats = storage.stats()
+        self.assertGreater(stats["hit_ratio"], 0.95)
+        self.assertEqual(stats["invalidations"], 0)
+
+        # Una baja de otro proceso sigue invalidando la credencial afectada, y solo esa
+        otro_proceso.remove_credential("service1", "caliente3")
+        self.assertIsNone(storage.get_credential("service1", "caliente3"))
+        self.assertEqual(storage.stats()["invalidations"], 1)
+        aciertos = storage.stats()["hits"]
+        self.assertEqual(storage.get_credential("service1", "caliente4"), b"hash")
+        self.assertEqual(storage.stats()["hits"], aciertos + 1)
+
+    def test_capacidad_invalida(self):
+        with self.assertRaises(ValueError):
+            TieredStorageStrategy(self.backend, capacity=0)
+
+if __name__ == "__main__":
+    unittest.main()